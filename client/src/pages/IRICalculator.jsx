@@ -1,10 +1,11 @@
-import React, { useState } from 'react';
+import React, { useMemo, useState } from 'react';
 import { useDropzone } from 'react-dropzone';
 import { fileService } from '../services/api';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import { Upload, FileText, Activity, AlertCircle } from 'lucide-react';
 
 import useAppStore from '../store/useAppStore';
+import { toChartRows } from '../utils/chartData';
 
 const IRICalculator = () => {
     const [files, setFiles] = useState([]);
@@ -86,6 +87,10 @@ const IRICalculator = () => {
         total_segments: iriFiles[iriFiles.length - 1].stats.totalSegments
     } : null);
 
+    // API chart series are columnar; Recharts needs row objects
+    const rawRows = useMemo(() => toChartRows(displayResult?.raw_data), [displayResult?.raw_data]);
+    const filteredRows = useMemo(() => toChartRows(displayResult?.filtered_data), [displayResult?.filtered_data]);
+
     const getQualityColor = (iri) => {
         if (iri <= 3) return 'text-green-600';
         if (iri <= 5) return 'text-yellow-400'; // Brighter Yellow
@@ -197,7 +202,7 @@ const IRICalculator = () => {
                             <h3 className="text-lg font-bold mb-4">Raw Accelerometer Data</h3>
                             <div className="h-80">
                                 <ResponsiveContainer width="100%" height="100%">
-                                    <LineChart data={displayResult.raw_data}>
+                                    <LineChart data={rawRows}>
                                         <CartesianGrid strokeDasharray="3 3" />
                                         <XAxis
                                             dataKey="time"
@@ -220,7 +225,7 @@ const IRICalculator = () => {
                             <h3 className="text-lg font-bold mb-4">Filtered Vertical Acceleration</h3>
                             <div className="h-80">
                                 <ResponsiveContainer width="100%" height="100%">
-                                    <LineChart data={displayResult.filtered_data}>
+                                    <LineChart data={filteredRows}>
                                         <CartesianGrid strokeDasharray="3 3" />
                                         <XAxis
                                             dataKey="time"
@@ -0,0 +1,20 @@
+/**
+ * Chart data helpers
+ * The IRI API sends chart series columnar ({ time: [...], ax: [...] });
+ * Recharts wants one object per point.
+ */
+
+// Columnar series -> array of row objects. Arrays (results saved before the
+// API switched to columns) pass through unchanged.
+export const toChartRows = (series) => {
+    if (!series || Array.isArray(series)) return series || [];
+    const keys = Object.keys(series);
+    const length = keys.length ? series[keys[0]].length : 0;
+    const rows = new Array(length);
+    for (let i = 0; i < length; i++) {
+        const row = {};
+        for (const key of keys) row[key] = series[key][i];
+        rows[i] = row;
+    }
+    return rows;
+};
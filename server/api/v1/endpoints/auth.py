@@ -14,7 +14,7 @@ from core.clerk_auth import get_current_user as get_clerk_user  # Clerk auth
 from models.user import Token, User, UserCreate, UserModel, VALID_ROLES
 from jose import jwt, JWTError
 
-router = APIRouter()
+router = APIRouter(prefix="/auth", tags=["auth"])
 logger = logging.getLogger(__name__)
 
 
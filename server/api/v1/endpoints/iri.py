@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from typing import Optional
 import os
 import gc
@@ -15,14 +16,16 @@ from core.config import settings
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from utils.file_handler import FileHandler
+from core.db_retry import with_db_retry_async
+from utils.response_cache import load_cached_payload
 
-router = APIRouter()
+router = APIRouter(prefix="/iri", tags=["iri"])
 
 # Initialize service
 iri_service = IRIService()
 file_handler = FileHandler()
 
-@router.get("/compute/{filename}", response_model=IRIComputationResponse)
+@router.get("/compute/{filename}", response_model=IRIComputationResponse, response_class=ORJSONResponse)
 async def compute_iri(
     filename: str,
     segment_length: int = Query(default=100, ge=25, le=500, description="Segment length in meters"),
@@ -50,7 +53,7 @@ async def compute_iri(
 
         # Use storage path from DB record
         storage_path = upload_record.storage_path
-        content_bytes = file_handler.storage.get_file_content(storage_path)
+        content_bytes = await file_handler.storage.aget_file_content(storage_path)
 
         file_obj = BytesIO(content_bytes)
         
@@ -66,7 +69,9 @@ async def compute_iri(
         if not result.success:
             raise HTTPException(status_code=400, detail=result.message)
         
-        return result
+        # Already validated by the service - hand the dump straight to orjson instead of
+        # letting FastAPI re-validate and jsonable_encoder-walk the chart arrays
+        return ORJSONResponse(result.model_dump())
         
     except HTTPException:
         raise
@@ -83,6 +88,7 @@ async def compute_iri(
 
 
 @router.get("/cached/{filename}")
+@with_db_retry_async()
 async def get_cached_iri(
     filename: str,
     current_user: UserModel = Depends(get_current_user),
@@ -93,8 +99,6 @@ async def get_cached_iri(
     This is the preferred endpoint for fetching IRI data.
     Data is cached during upload for fast retrieval.
     """
-    import json
-    
     # Find the file record (shared data model - all users can see)
     upload_record = db.query(UploadModel).filter(
         UploadModel.file_type == 'csv',
@@ -105,13 +109,10 @@ async def get_cached_iri(
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
     
     # Return cached data if available
-    if upload_record.cached_data:
-        try:
-            cached = json.loads(upload_record.cached_data)
-            cached['from_cache'] = True
-            return cached
-        except json.JSONDecodeError:
-            pass  # Fall through to processing
+    cached = load_cached_payload(upload_record)
+    if cached is not None:
+        cached['from_cache'] = True
+        return cached
     
     # No cache available - return error (upload should have cached it)
     raise HTTPException(
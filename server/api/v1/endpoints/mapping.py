@@ -6,7 +6,7 @@ from services.mapping_service import MappingService
 from models.mapping_models import VehicleMappingResponse, PotholeMappingResponse, PavementMappingResponse
 from utils.file_handler import FileHandler
 
-router = APIRouter()
+router = APIRouter(prefix="/mapping", tags=["mapping"])
 mapping_service = MappingService()
 file_handler = FileHandler()
 
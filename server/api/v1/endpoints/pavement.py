@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional, Dict, Any, Union
 import os
+import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from io import BytesIO
 
 from models.upload import UploadModel
@@ -13,12 +14,15 @@ from core.clerk_auth import get_current_user  # Clerk auth
 from core import security  # Keep for backwards compatibility
 from core.config import settings
 from utils.file_handler import FileHandler
+from models.mapping_models import LatLonArray
 
-router = APIRouter()
+router = APIRouter(prefix="/pavement", tags=["pavement"])
 file_handler = FileHandler()
 
 class PavementSegment(BaseModel):
-    points: List[List[float]] # [[lat, lon], [lat, lon]]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    points: LatLonArray # (N, 2) float32, serialized as [[lat, lon], [lat, lon]]
     type: str
     color: str
     start_time: Optional[Any] = None
@@ -52,7 +56,7 @@ async def process_pavement_data(
 
     try:
         # 2. Get file content from storage (works for both local and R2)
-        content_bytes = file_handler.storage.get_file_content(upload_record.storage_path)
+        content_bytes = await file_handler.storage.aget_file_content(upload_record.storage_path)
         df = pd.read_csv(BytesIO(content_bytes))
         
         # Normalize column names
@@ -86,55 +90,31 @@ async def process_pavement_data(
                 "data": []
             }
             
-        current_type = None
-        current_points = []
-        
         # Logic to group consecutive points
-        segment_start_time = None
-        current_end_time = None
-
-        for _, row in df.iterrows():
-            p_type = row['type']
-            lat = float(row['latitude'])
-            lon = float(row['longitude'])
-            
-            # Extract timestamp
-            timestamp = None
-            if 'timestamp' in row:
-                timestamp = row['timestamp']
-            elif 'time' in row:
-                timestamp = row['time']
-
-            # Set start time for new segment
-            if not current_points:
-                segment_start_time = timestamp
-            
-            current_end_time = timestamp
-
-            # If type changes, save segment
-            if current_type is not None and p_type != current_type:
-                if len(current_points) >= 2:
-                    segments.append({
-                        "points": current_points,
-                        "type": current_type,
-                        "color": color_map.get(current_type, '#808080'),
-                        "start_time": segment_start_time,
-                        "end_time": current_end_time
-                    })
-                current_points = []
-                segment_start_time = timestamp # Reset start time for next segment containing this point
-                
-            current_points.append([lat, lon])
-            current_type = p_type
+        # One (N, 2) float32 coordinate block; each segment is a slice of it
+        coords = df[['latitude', 'longitude']].to_numpy(dtype=np.float32)
+        types = df['type']
         
-        # Add final segment
-        if len(current_points) >= 2:
+        # Extract timestamp
+        timestamp_col = next((c for c in ('timestamp', 'time') if c in df.columns), None)
+        timestamps = df[timestamp_col].tolist() if timestamp_col else None
+        
+        # Runs of consecutive rows with the same type: [starts[i], ends[i])
+        n_rows = len(df)
+        starts = np.flatnonzero(types.ne(types.shift()).to_numpy())
+        ends = np.append(starts[1:], n_rows)
+
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            segment_type = types.iat[start]
             segments.append({
-                "points": current_points,
-                "type": current_type,
-                "color": color_map.get(current_type, '#808080'),
-                "start_time": segment_start_time,
-                "end_time": current_end_time
+                "points": coords[start:end],
+                "type": segment_type,
+                "color": color_map.get(segment_type, '#808080'),
+                # A segment ends at the point where the type changes (or the last point)
+                "start_time": timestamps[start] if timestamps else None,
+                "end_time": timestamps[min(end, n_rows - 1)] if timestamps else None
             })
 
         return {
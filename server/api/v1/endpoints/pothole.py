@@ -7,10 +7,7 @@ from functools import lru_cache
 import pandas as pd
 import os
 from pathlib import Path
-import math
 import logging
-import json
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 from core.config import settings
@@ -21,13 +18,16 @@ from models.user import UserModel
 from core.database import get_db
 from core.clerk_auth import get_current_user  # Clerk auth
 from core import security  # Keep for backwards compatibility
+from core.db_retry import with_db_retry_async
+from utils.response_cache import load_cached_payload, store_cached_payload, clear_cached_payload
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 
-router = APIRouter()
+router = APIRouter(prefix="/pothole", tags=["pothole"])
 file_handler = FileHandler()
 
 @router.get("/process/{filename}", response_model=Dict[str, Any])
+@with_db_retry_async()
 async def process_pothole_data(
     filename: str,
     current_user: UserModel = Depends(get_current_user),
@@ -53,17 +53,16 @@ async def process_pothole_data(
     # CACHE CHECK - Return cached data if available
     # We regenerate presigned URLs since they expire after 1 hour
     # ============================================
-    if upload_record.cached_data:
+    cached_response = load_cached_payload(upload_record)
+    if cached_response is not None:
         try:
-            cached_response = json.loads(upload_record.cached_data)
-            
             # Check if cache has storage_path (new format) - invalidate old caches
             if cached_response.get('data') and len(cached_response['data']) > 0:
                 first_marker = cached_response['data'][0]
                 if not first_marker.get('storage_path'):
                     # Old cache format without storage_path - need to re-process
                     logger.info(f"Invalidating old cache for {filename} (missing storage_path)")
-                    upload_record.cached_data = None
+                    clear_cached_payload(upload_record)
                     db.commit()
                 else:
                     # Regenerate presigned URLs for all markers (they expire after 1 hour)
@@ -80,8 +79,8 @@ async def process_pothole_data(
                     
                     logger.info(f"Returning cached pothole data for {filename} (regenerated URLs)")
                     return cached_response
-        except json.JSONDecodeError:
-            # Invalid cache, proceed to re-process
+        except (KeyError, TypeError, AttributeError):
+            # Malformed cache, proceed to re-process
             pass
     
     try:
@@ -89,7 +88,7 @@ async def process_pothole_data(
         path_to_read = upload_record.storage_path
 
         # Get content using storage service (works for Local and R2)
-        content_bytes = file_handler.storage.get_file_content(path_to_read)
+        content_bytes = await file_handler.storage.aget_file_content(path_to_read)
         
         from io import BytesIO
         df = pd.read_csv(BytesIO(content_bytes))
@@ -115,29 +114,29 @@ async def process_pothole_data(
         
         markers_data = []
         
-        for idx, row in df.iterrows():
+        # Coerce and validate whole columns once; rows with unusable coordinates
+        # or confidence are dropped up front instead of failing one at a time
+        lats = pd.to_numeric(df['latitude'], errors='coerce')
+        lons = pd.to_numeric(df['longitude'], errors='coerce')
+        confidences = pd.to_numeric(df['confidence_score'], errors='coerce')
+        valid = lats.notna() & lons.notna() & confidences.notna()
+        
+        # Extract timestamp column (case-insensitive check)
+        columns_lower = {c.lower(): c for c in df.columns}
+        timestamp_col = next((columns_lower[k] for k in ('timestamp', 'time', 'date') if k in columns_lower), None)
+        timestamps = df.loc[valid, timestamp_col].tolist() if timestamp_col else None
+        
+        rows = zip(
+            df.index[valid.to_numpy()].tolist(),
+            lats[valid].astype(float).tolist(),
+            lons[valid].astype(float).tolist(),
+            df.loc[valid, 'image_path'].tolist(),  # e.g. "frame_11030.jpg"
+            confidences[valid].astype(float).tolist(),
+        )
+        
+        for i, (idx, lat, lon, image_path, confidence) in enumerate(rows):
             try:
-                lat = float(row['latitude'])
-                lon = float(row['longitude'])
-                
-                if math.isnan(lat) or math.isnan(lon):
-                    continue
-                    
-                image_path = row['image_path'] # e.g. "frame_11030.jpg"
-                confidence = float(row['confidence_score'])
-                
-                # Extract timestamp (case-insensitive check)
-                timestamp = None
-                # Normalize keys to lowercase for checking
-                row_keys_lower = {k.lower(): k for k in row.keys()}
-                
-                if 'timestamp' in row_keys_lower:
-                    timestamp = row[row_keys_lower['timestamp']]
-                elif 'time' in row_keys_lower:
-                    timestamp = row[row_keys_lower['time']]
-                elif 'date' in row_keys_lower:
-                    timestamp = row[row_keys_lower['date']]
-                
+                timestamp = timestamps[i] if timestamps else None
 
                 # Generate direct R2 URL (Presigned) to bypass backend proxy and save memory
                 storage_path = image_map.get(image_path)
@@ -204,8 +203,7 @@ async def process_pothole_data(
         # CACHE STORE - Save processed data for future requests
         # ============================================
         try:
-            upload_record.cached_data = json.dumps(response_data)
-            upload_record.cache_timestamp = datetime.utcnow()
+            store_cached_payload(upload_record, response_data)
             db.commit()
             logger.info(f"Cached pothole data for {filename} ({len(markers_data)} markers)")
         except Exception as cache_err:
@@ -1,21 +1,23 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple, Dict, Any
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects import postgresql, sqlite
 import uuid
 import hashlib
 from datetime import datetime
 import logging
 
 from models.user import UserModel
-from models.upload import UploadModel, PotholeImageModel
+from models.upload import UploadModel, PotholeImageModel, UploadCategory
 from core.database import get_db
 from core.clerk_auth import get_current_user
 from services.storage_service import get_storage_service, R2StorageService
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(prefix="/presign", tags=["presign"])
 
 # Get storage service
 storage = get_storage_service()
@@ -25,7 +27,7 @@ class PresignRequest(BaseModel):
     """Request for a presigned upload URL"""
     filename: str
     content_type: str = "image/jpeg"
-    category: str = "pothole"
+    category: UploadCategory = "pothole"
 
 
 class PresignResponse(BaseModel):
@@ -41,7 +43,7 @@ class RegisterUploadRequest(BaseModel):
     original_filename: str
     file_size: int
     content_type: str
-    category: str = "pothole"
+    category: UploadCategory = "pothole"
     file_hash: Optional[str] = None
 
 
@@ -147,6 +149,63 @@ async def get_batch_presigned_urls(
     return BatchPresignResponse(urls=urls)
 
 
+def _upsert_insert(db: Session):
+    """Dialect-specific insert() that supports ON CONFLICT (PostgreSQL in prod, SQLite in dev)."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+# Whether uploads has the (user_id, file_hash) unique constraint that ON CONFLICT needs.
+# None until the first registration finds out; False on databases that haven't run
+# scripts/add_user_filehash_unique.py yet, which then use SELECT-then-INSERT.
+_upsert_available: Optional[bool] = None
+
+
+def _is_missing_conflict_target(e: DBAPIError) -> bool:
+    """The ON CONFLICT target has no matching unique constraint/index (PostgreSQL 42P10, SQLite)."""
+    if getattr(e.orig, 'pgcode', None) == '42P10':
+        return True
+    return "ON CONFLICT clause does not match" in str(e.orig)
+
+
+def _insert_or_get_upload(db: Session, values: Dict[str, Any]) -> Tuple[int, str]:
+    """
+    Insert the upload row, or return (id, storage_path) of the row already registered
+    for the same (user_id, file_hash). Caller commits.
+    """
+    global _upsert_available
+    if _upsert_available is not False:
+        # One round trip that either inserts or returns the existing row
+        insert_stmt = _upsert_insert(db)(UploadModel).values(**values)
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=['user_id', 'file_hash'],
+            set_={'file_hash': insert_stmt.excluded.file_hash}  # No-op so RETURNING yields the existing row
+        ).returning(UploadModel.id, UploadModel.storage_path)
+        try:
+            upload_id, stored_path = db.execute(upsert_stmt).one()
+            _upsert_available = True
+            return upload_id, stored_path
+        except DBAPIError as e:
+            if not _is_missing_conflict_target(e):
+                raise
+            db.rollback()
+            _upsert_available = False
+            logger.warning(
+                "uploads has no uq_user_filehash constraint - falling back to SELECT-then-INSERT. "
+                "Run scripts/add_user_filehash_unique.py."
+            )
+
+    existing = db.query(UploadModel.id, UploadModel.storage_path).filter(
+        UploadModel.user_id == values['user_id'],
+        UploadModel.file_hash == values['file_hash']
+    ).first()
+    if existing:
+        return existing.id, existing.storage_path
+    db_upload = UploadModel(**values)
+    db.add(db_upload)
+    db.flush()
+    return db_upload.id, db_upload.storage_path
+
+
 @router.post("/register", response_model=RegisterUploadResponse)
 async def register_upload(
     request: RegisterUploadRequest,
@@ -164,8 +223,8 @@ async def register_upload(
         # Get file extension
         file_ext = request.original_filename.split('.')[-1].lower() if '.' in request.original_filename else ''
         
-        # Create upload record
-        db_upload = UploadModel(
+        # Create upload record, or find the one already registered for this (user_id, file_hash)
+        upload_id, stored_path = _insert_or_get_upload(db, dict(
             user_id=current_user.id,
             filename=request.object_key.split('/')[-1],  # UUID filename
             original_filename=request.original_filename,
@@ -174,10 +233,18 @@ async def register_upload(
             storage_path=request.object_key,
             file_size=request.file_size,
             file_hash=request.file_hash or hashlib.md5(request.object_key.encode()).hexdigest()
-        )
-        db.add(db_upload)
+        ))
         db.commit()
-        db.refresh(db_upload)
+        
+        if stored_path != request.object_key:
+            # Same content was already registered - drop the redundant object just uploaded
+            await storage.delete_file(request.object_key)
+            logger.info(f"Deduplicated direct upload: {request.original_filename} -> existing {stored_path}")
+            return RegisterUploadResponse(
+                success=True,
+                id=upload_id,
+                message=f"{request.original_filename} already exists (deduplicated)"
+            )
         
         # For pothole images, link to most recent CSV
         if request.category == "pothole" and file_ext in ['jpg', 'jpeg', 'png', 'gif', 'bmp']:
@@ -200,7 +267,7 @@ async def register_upload(
         
         return RegisterUploadResponse(
             success=True,
-            id=db_upload.id,
+            id=upload_id,
             message=f"Registered {request.original_filename}"
         )
         
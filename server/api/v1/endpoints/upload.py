@@ -1,29 +1,30 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, func, bindparam, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, Query
 import os
 import logging
 import gc  # Garbage collection for memory management
-import json
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 from models.iri_models import FileUploadResponse, ErrorResponse
-from models.upload import UploadModel, PotholeImageModel, Upload, UploadCreate
+from models.upload import UploadModel, PotholeImageModel, Upload, UploadCreate, UploadCategory
 from models.user import UserModel
-from utils.file_handler import FileHandler
+from utils.file_handler import FileHandler, hash_file, csv_unique_values
+from starlette.concurrency import run_in_threadpool
 from services.iri_service import IRIService
 from services.iri_lite import process_iri_chunked  # Lightweight IRI processor
+from services.vehicle_service import build_vehicle_cache, parquet_sibling_path
+from utils.response_cache import store_cached_payload
 from core.database import get_db
 from core.clerk_auth import get_current_user  # Clerk auth
 from core import security  # Keep for backwards compatibility
 from core.config import settings
-import hashlib
 import pandas as pd
-from io import BytesIO
 
-router = APIRouter()
+router = APIRouter(prefix="/upload", tags=["upload"])
 
 # Initialize services
 file_handler = FileHandler()
@@ -39,8 +40,9 @@ ALLOWED_EXTENSIONS = {
 
 @router.post("/", response_model=List[FileUploadResponse])
 async def upload_files(
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...), 
-    type: str = "iri",
+    type: UploadCategory = "iri",
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -59,6 +61,7 @@ async def upload_files(
     
     results = []
     pothole_csv_upload_id = None  # Track CSV upload for linking images
+    pothole_image_links = []  # Image -> CSV links, inserted in one batch after the loop
     
     # ---------------------------------------------------------
     # SMART FILTERING (STRICT MODE) FOR POTHOLE UPLOADS
@@ -73,9 +76,9 @@ async def upload_files(
             # CSV in current batch - use it for filtering
             try:
                 csv_file.file.seek(0)
-                df_scan = pd.read_csv(csv_file.file)
-                if 'image_path' in df_scan.columns:
-                    allowed_pothole_images = set(df_scan['image_path'].dropna().unique())
+                image_names = csv_unique_values(csv_file.file, 'image_path')
+                if image_names is not None:
+                    allowed_pothole_images = set(image_names)
                 csv_file.file.seek(0)
             except Exception as e:
                 logger.warning(f"Failed to scan CSV for image filtering: {e}")
@@ -93,10 +96,10 @@ async def upload_files(
                     pothole_csv_upload_id = existing_csv.id
                     # Fetch CSV content from storage and extract allowed images
                     try:
-                        csv_content = file_handler.storage.get_file_content(existing_csv.storage_path)
-                        df_scan = pd.read_csv(BytesIO(csv_content))
-                        if 'image_path' in df_scan.columns:
-                            allowed_pothole_images = set(df_scan['image_path'].dropna().unique())
+                        csv_content = await file_handler.storage.aget_file_content(existing_csv.storage_path)
+                        image_names = csv_unique_values(csv_content, 'image_path')
+                        if image_names is not None:
+                            allowed_pothole_images = set(image_names)
                         logger.info(f"Using existing CSV for filtering: {existing_csv.original_filename} ({len(allowed_pothole_images) if allowed_pothole_images else 0} images)")
                     except Exception as e:
                         logger.warning(f"Failed to read existing CSV for filtering: {e}")
@@ -145,19 +148,9 @@ async def upload_files(
                 ))
                 continue
             
-            # Calculate file hash for deduplication
-            hash_md5 = hashlib.md5()
-            # Read in chunks to avoid memory issues with large files
-            file.file.seek(0)
-            for chunk in iter(lambda: file.file.read(4096), b""):
-                hash_md5.update(chunk)
-            file_hash = hash_md5.hexdigest()
-            file.file.seek(0) # Reset pointer
-            
-            # File size
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
+            # Calculate file hash (and size) for deduplication
+            # Chunked read in a worker thread - hashlib releases the GIL on large buffers
+            file_hash, file_size = await run_in_threadpool(hash_file, file.file)
 
             # Smart Deduplication: Check if file already exists
             existing_upload = db.query(UploadModel).filter(
@@ -247,6 +240,13 @@ async def upload_files(
                 if type == "pothole":
                     pothole_csv_upload_id = db_upload.id
                 
+                # ============================================
+                # VEHICLE: Precompute map data after the response is sent
+                # so the first GET /vehicle/process is already a cache hit
+                # ============================================
+                if type == "vehicle":
+                    background_tasks.add_task(build_vehicle_cache, db_upload.id, file_handler.storage)
+                
                 # ============================================
                 # IRI: Process and cache during upload for instant fetches
                 # ============================================
@@ -258,8 +258,7 @@ async def upload_files(
                         
                         if iri_result['success']:
                             # Store only the lightweight map data
-                            db_upload.cached_data = json.dumps(iri_result)
-                            db_upload.cache_timestamp = datetime.utcnow()
+                            store_cached_payload(db_upload, iri_result)
                             db.commit()
                             logger.info(f"Cached {len(iri_result['segments'])} IRI segments for {file.filename}")
                             message = f"Processed {len(iri_result['segments'])} road segments."
@@ -299,12 +298,10 @@ async def upload_files(
                 
                 # If we have a pothole CSV, link this image to it
                 if pothole_csv_upload_id:
-                    pothole_image = PotholeImageModel(
-                        upload_id=pothole_csv_upload_id,
-                        image_path=storage_path
-                    )
-                    db.add(pothole_image)
-                    db.commit()
+                    pothole_image_links.append({
+                        "upload_id": pothole_csv_upload_id,
+                        "image_path": storage_path
+                    })
                 
                 results.append(FileUploadResponse(
                     success=True,
@@ -342,6 +339,15 @@ async def upload_files(
             
             # Force garbage collection (critical for Render's 512MB limit)
             gc.collect()
+    
+    # Link uploaded pothole images to their CSV - one executemany instead of a commit per image
+    if pothole_image_links:
+        try:
+            db.execute(insert(PotholeImageModel), pothole_image_links)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to link {len(pothole_image_links)} pothole images: {e}")
             
     return results
 
@@ -367,7 +373,7 @@ async def list_uploaded_files(
 
 @router.get("/files/{category}")
 async def list_files_by_category(
-    category: str,
+    category: UploadCategory,
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -389,6 +395,21 @@ async def list_files_by_category(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing files: {str(e)}")
 
+def _filter_original_filenames(db: Session, query: Query, names: List[str]) -> Query:
+    """
+    Restrict an UploadModel query to rows whose original_filename is in `names`.
+    On PostgreSQL the names go in as one text[] bind and are joined via unnest(),
+    which the planner hashes once; SQLite (dev) keeps a plain IN list.
+    `names` must be distinct, or the join would repeat rows.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return query.filter(UploadModel.original_filename.in_(names))
+    name_rows = func.unnest(
+        bindparam("names", names, type_=postgresql.ARRAY(String))
+    ).table_valued("name")
+    return query.join(name_rows, UploadModel.original_filename == name_rows.c.name)
+
+
 @router.delete("/{upload_id}")
 async def delete_upload(
     upload_id: int,
@@ -420,43 +441,47 @@ async def delete_upload(
         if upload.category == 'pothole' and upload.file_type == 'csv':
             try:
                 # 1. Read the CSV content
-                content_bytes = file_handler.storage.get_file_content(upload.storage_path)
-                df = pd.read_csv(BytesIO(content_bytes))
+                content_bytes = await file_handler.storage.aget_file_content(upload.storage_path)
                 
                 # 2. Extract image paths (filenames)
-                if 'image_path' in df.columns:
-                    image_filenames = df['image_path'].dropna().unique().tolist()
+                image_filenames = csv_unique_values(content_bytes, 'image_path')
+                if image_filenames is not None:
                     if image_filenames:
                         logger.debug(f"Found {len(image_filenames)} images to cascade delete.")
                         
                         # 3. Find UploadModel records for these images
                         # We match by original_filename because R2 filenames are UUIDs
-                        images_to_delete = db.query(UploadModel).filter(
-                            UploadModel.user_id == current_user.id,
-                            UploadModel.category == 'pothole',
-                            UploadModel.original_filename.in_(image_filenames)
+                        # (csv_unique_values already de-duplicated the names)
+                        images_to_delete = _filter_original_filenames(
+                            db,
+                            db.query(UploadModel).filter(
+                                UploadModel.user_id == current_user.id,
+                                UploadModel.category == 'pothole'
+                            ),
+                            image_filenames
                         ).all()
                         
-                        # 4. Delete them
+                        # 4. Delete them - storage in batched calls (up to 1000 keys each),
+                        # then every DB row in one commit
+                        deleted_files = await file_handler.delete_files_async(
+                            [img_upload.storage_path for img_upload in images_to_delete]
+                        )
                         for img_upload in images_to_delete:
-                            try:
-                                # Delete from R2
-                                await file_handler.delete_file_async(img_upload.storage_path)
-                                # Delete from DB
-                                db.delete(img_upload)
-                                db.commit() # Force commit immediately
-                            except Exception as e:
-                                logger.warning(f"Error cascading delete for {img_upload.filename}: {e}")
-                                # Continue deleting others even if one fails
+                            db.delete(img_upload)
+                        db.commit()
                         
-                        logger.debug(f"Cascade deleted {len(images_to_delete)} image records.")
+                        logger.debug(f"Cascade deleted {len(images_to_delete)} image records ({deleted_files} files).")
                         
             except Exception as e:
                 # Log error but don't stop the main deletion
+                db.rollback()
                 logger.warning(f"Smart deletion logic failed: {e}")
 
         # Delete from storage
         await file_handler.delete_file_async(upload.storage_path)
+        if upload.category == 'vehicle' and upload.file_type == 'csv':
+            # Parquet sibling written at upload time (may not exist for older uploads)
+            await file_handler.delete_file_async(parquet_sibling_path(upload.storage_path))
         
         # Delete from database (cascade will delete related pothole_images)
         db.delete(upload)
@@ -1,13 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
 import os
-import pandas as pd
 import json
 import logging
-from datetime import datetime
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from io import BytesIO
 
 from models.upload import UploadModel
 from models.user import UserModel
@@ -15,10 +14,17 @@ from core.database import get_db
 from core.clerk_auth import get_current_user  # Clerk auth
 from core import security  # Keep for backwards compatibility
 from core.config import settings
+from core.db_retry import with_db_retry_async
+from core.singleflight import single_flight
 from utils.file_handler import FileHandler
+from utils.response_cache import gzip_json_response, decompress_payload, cache_etag, etag_matches
+from services.vehicle_service import (
+    parse_vehicle_csv, parse_vehicle_parquet, parquet_sibling_path,
+    store_vehicle_cache_for_upload, aggregate_vehicle_payload
+)
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(prefix="/vehicle", tags=["vehicle"])
 file_handler = FileHandler()
 
 class VehicleDetection(BaseModel):
@@ -34,9 +40,68 @@ class VehicleProcessResponse(BaseModel):
     count: int
     data: List[VehicleDetection]
 
+def _find_vehicle_upload(db: Session, filename: str) -> Optional[UploadModel]:
+    """
+    Latest vehicle CSV matching either the stored or the original filename.
+    Written as a UNION ALL of the two name matches (instead of an OR) so each
+    branch can use its own idx_vehicle_lookup_* partial index.
+    """
+    def by_name(column):
+        return db.query(UploadModel).filter(
+            UploadModel.category == 'vehicle',
+            UploadModel.file_type == 'csv',
+            column == filename
+        )
+
+    return by_name(UploadModel.filename).union_all(
+        by_name(UploadModel.original_filename)
+    ).order_by(UploadModel.upload_date.desc().nulls_last()).first()
+
+async def _load_vehicle_payload(storage_path: str, filename: str) -> Dict[str, Any]:
+    """
+    Prefer the Parquet sibling written at upload time; fall back to parsing the CSV.
+    """
+    try:
+        parquet_bytes = await file_handler.storage.aget_file_content(parquet_sibling_path(storage_path))
+        return await run_in_threadpool(parse_vehicle_parquet, parquet_bytes, filename)
+    except Exception:
+        # No Parquet copy (older upload or pyarrow unavailable) - parse the CSV
+        pass
+
+    content_bytes = await file_handler.storage.aget_file_content(storage_path)
+    return await run_in_threadpool(parse_vehicle_csv, content_bytes, filename)
+
+async def _fill_vehicle_cache(
+    upload_id: int, storage_path: str, filename: str
+) -> Tuple[Dict[str, Any], Optional[bytes], Optional[datetime]]:
+    """
+    Load the payload and store it as the upload's cache - once per upload, however
+    many requests miss together (single-flighted, so it only takes plain values and
+    uses its own session). Returns (payload, gzipped blob, cache_timestamp); the blob
+    and timestamp are None when nothing was cached.
+    """
+    response_data = await _load_vehicle_payload(storage_path, filename)
+
+    # ============================================
+    # CACHE STORE - Save processed data for future requests
+    # ============================================
+    cached_blob, cache_timestamp = None, None
+    if response_data["data"]:
+        try:
+            cached_blob, cache_timestamp = await run_in_threadpool(
+                store_vehicle_cache_for_upload, upload_id, response_data
+            )
+        except Exception as cache_err:
+            logger.warning(f"Failed to cache data: {cache_err}")
+    return response_data, cached_blob, cache_timestamp
+
 @router.get("/process/{filename}", response_model=VehicleProcessResponse)
+@with_db_retry_async()
 async def process_vehicle_data(
     filename: str,
+    request: Request,
+    response: Response,
+    grid: Optional[int] = Query(default=None, ge=0, le=6, description="Aggregate detections into a lat/lon grid rounded to this many decimals (4 = ~11 m cells)"),
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -44,101 +109,62 @@ async def process_vehicle_data(
     Process a vehicle detection CSV file and return map-ready data.
     Uses caching for fast repeat requests.
     - All users can view shared data (read-only for non-admins)
+    - Pass `grid` to receive one entry per grid cell with `count` detections instead of raw points
     """
     # Find the file in the database - ALL users see shared data
-    upload_record = db.query(UploadModel).filter(
-        UploadModel.category == 'vehicle',
-        UploadModel.file_type == 'csv',
-        (UploadModel.filename == filename) | (UploadModel.original_filename == filename)
-    ).order_by(UploadModel.upload_date.desc()).first()
+    upload_record = await run_in_threadpool(_find_vehicle_upload, db, filename)
 
     if not upload_record:
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
 
     # ============================================
     # CACHE CHECK - Return cached data if available
+    # cache_timestamp doubles as the ETag, so repeat loads get a bodiless 304
+    # Gzipped cache is served as-is (Content-Encoding: gzip)
     # ============================================
-    if upload_record.cached_data:
+    etag = cache_etag(upload_record.id, upload_record.cache_timestamp)
+    has_cache = bool(upload_record.cached_data_gz or upload_record.cached_data)
+    if has_cache and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+    response_data = None
+    if upload_record.cached_data_gz:
+        if grid is None:
+            logger.info(f"Returning cached vehicle data for {filename}")
+            return gzip_json_response(upload_record.cached_data_gz, request, headers={"ETag": etag} if etag else None)
+        response_data = await run_in_threadpool(decompress_payload, upload_record.cached_data_gz)
+    elif upload_record.cached_data:
         try:
-            cached_response = json.loads(upload_record.cached_data)
+            response_data = json.loads(upload_record.cached_data)
             logger.info(f"Returning cached vehicle data for {filename}")
-            return cached_response
         except json.JSONDecodeError:
             # Invalid cache, proceed to re-process
             pass
 
-    try:
-        # 2. Get file content from storage (works for both local and R2)
-        content_bytes = file_handler.storage.get_file_content(upload_record.storage_path)
-        df = pd.read_csv(BytesIO(content_bytes))
-        
-        # Normalize column names
-        df.columns = [c.lower() for c in df.columns]
-        
-        # Check required columns
-        required = ['latitude', 'longitude', 'vehicle_type']
-        missing = [c for c in required if c not in df.columns]
-        if missing:
-            # Try fallback names if specific ones missing
-            if 'lat' in df.columns: df.rename(columns={'lat': 'latitude'}, inplace=True)
-            if 'lon' in df.columns: df.rename(columns={'lon': 'longitude'}, inplace=True)
-            
-            # Recheck
-            missing = [c for c in required if c not in df.columns]
-            if missing:
-                raise ValueError(f"Missing columns: {missing}")
-
-        # Filter rows
-        valid_types = ['car', 'truck', 'bicycle', 'motorcycle']
-        df = df[df['vehicle_type'].isin(valid_types)].copy()
-        
-        if df.empty:
-            return {
-                "success": True,
-                "filename": filename,
-                "count": 0,
-                "data": []
-            }
-        
-        # Convert to list of objects
-        result_data = []
-        for _, row in df.iterrows():
-            # Extract timestamp if available
-            timestamp = None
-            if 'timestamp' in row:
-                timestamp = row['timestamp']
-            elif 'time' in row:
-                timestamp = row['time']
-
-            result_data.append({
-                "lat": float(row['latitude']),
-                "lon": float(row['longitude']),
-                "type": row['vehicle_type'],
-                "timestamp": timestamp,
-                "count": 1
-            })
-        
-        response_data = {
-            "success": True,
-            "filename": filename,
-            "count": len(result_data),
-            "data": result_data
-        }
-
-        # ============================================
-        # CACHE STORE - Save processed data for future requests
-        # ============================================
+    if response_data is None:
         try:
-            upload_record.cached_data = json.dumps(response_data)
-            upload_record.cache_timestamp = datetime.utcnow()
-            db.commit()
-            logger.info(f"Cached vehicle data for {filename} ({len(result_data)} records)")
-        except Exception as cache_err:
-            logger.warning(f"Failed to cache data: {cache_err}")
-            
-        return response_data
+            # 2. Get file content from storage (works for both local and R2)
+            # Concurrent cache misses for the same upload share one parse and one cache write
+            response_data, cached_blob, cache_timestamp = await single_flight(
+                f"vehicle_payload:{upload_record.id}", _fill_vehicle_cache,
+                upload_record.id, upload_record.storage_path, filename
+            )
+            if cached_blob is not None:
+                etag = cache_etag(upload_record.id, cache_timestamp)
+                if grid is None:
+                    return gzip_json_response(cached_blob, request, headers={"ETag": etag})
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing CSV: {str(e)}")
+
+    # ============================================
+    # GRID - Aggregate raw detections into lat/lon cells (count per cell)
+    # ============================================
+    if grid is not None:
+        response_data = await run_in_threadpool(aggregate_vehicle_payload, response_data, grid)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing CSV: {str(e)}")
+    if etag:
+        response.headers["ETag"] = etag
+    return response_data
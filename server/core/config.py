@@ -23,6 +23,10 @@ class Settings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "300"))  # Below typical NAT idle timeouts
     
     # Clerk Authentication
     CLERK_SECRET_KEY: str = os.getenv("CLERK_SECRET_KEY", "")
@@ -35,6 +39,8 @@ class Settings:
     R2_BUCKET_NAME: str = os.getenv("R2_BUCKET_NAME", "daan-bucket")
     R2_ENDPOINT_URL: str = os.getenv("R2_ENDPOINT_URL", "")
     R2_PUBLIC_URL: str = os.getenv("R2_PUBLIC_URL", "")  # Required in production
+    # Bytes per read when streaming files in or out of storage
+    STREAM_CHUNK_SIZE: int = int(os.getenv("STREAM_CHUNK_SIZE", str(1024 * 1024)))
     
     API_V1_STR: str = "/api/v1"
     
@@ -16,23 +16,36 @@ else:
     connect_args = {
         "connect_timeout": 30,           # Connection timeout - allow 30s for cold start
         "keepalives": 1,                 # Enable TCP keepalives
-        "keepalives_idle": 10,           # Seconds before sending keepalive (reduced)
-        "keepalives_interval": 5,        # Interval between keepalives (reduced)
-        "keepalives_count": 10,          # Number of keepalives before giving up
+        "keepalives_idle": 30,           # Seconds idle before sending keepalive
+        "keepalives_interval": 10,       # Interval between keepalives
+        "keepalives_count": 3,           # Dead peer detected after ~60s instead of lingering
         "options": "-c statement_timeout=60000"  # 60s statement timeout
     }
 
 # Configure engine with optimized pool settings for Supabase
 # Optimized for cross-region connections with cold-start handling
+# (sizes are overridable via DB_POOL_* environment variables)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
     connect_args=connect_args,
     poolclass=QueuePool,
-    pool_pre_ping=True,           # Check if connection is alive before use
-    pool_recycle=60,              # Recycle connections every 1 minute (more aggressive)
-    pool_size=2,                  # Smaller pool for faster pre-ping
-    max_overflow=3,               # Limited overflow
-    pool_timeout=60,              # Wait up to 60s for a connection from pool
+    pool_pre_ping=True,                         # Check if connection is alive before use
+    pool_recycle=settings.DB_POOL_RECYCLE,      # Reconnect before NAT/middlebox idle timeouts drop us
+    pool_size=settings.DB_POOL_SIZE,            # Enough warm connections for concurrent requests
+    max_overflow=settings.DB_MAX_OVERFLOW,      # Burst headroom beyond the warm pool
+    pool_timeout=settings.DB_POOL_TIMEOUT,      # Fail fast instead of queueing for a minute
+)
+
+# Dedicated single-connection engine for the /health keepalive ping
+# Keeps probes from taking slots in the main pool and skips Session setup entirely
+keepalive_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args=connect_args,
+    poolclass=QueuePool,
+    pool_pre_ping=False,          # The ping itself is the liveness check
+    pool_recycle=240,             # Reconnect before typical 5 min NAT idle timeouts
+    pool_size=1,
+    max_overflow=0,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -3,47 +3,141 @@ Database retry utility for handling transient connection failures.
 Useful for cross-region connections (e.g., Render US <-> Supabase Singapore).
 """
 
+import os
+import re
 import time
+import tempfile
+import random
+import asyncio
 import logging
 from functools import wraps
 from sqlalchemy.exc import OperationalError, InterfaceError
+from typing import Any, Callable, Optional
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATE class 08 (connection exception) and 57P0x (server shutting down / unavailable)
+_CONN_SQLSTATES = frozenset({
+    "08000", "08003", "08006", "08001", "08004", "08007",
+    "57P01", "57P02", "57P03",
+})
 
-def with_db_retry(max_retries: int = 3, delay: float = 0.5):
+# Fallback for drivers without pgcode (e.g. SQLite, or errors raised before a server reply)
+_CONN_RE = re.compile(
+    r"connection|timeout|could not connect|server closed|connection refused|connection reset|eof detected",
+    re.IGNORECASE,
+)
+
+
+# Process-local result cache for idempotent reads (opt-in via cache_key=...)
+_CACHE = None
+_CACHE_DIR = os.path.join(tempfile.gettempdir(), "daan_db_cache")
+_CACHE_SIZE_LIMIT = 256 << 20  # 256 MiB
+_MISS = object()
+
+
+def _get_cache():
+    """Lazily open the diskcache store; returns None if diskcache is unavailable."""
+    global _CACHE
+    if _CACHE is None:
+        try:
+            import diskcache
+            _CACHE = diskcache.Cache(_CACHE_DIR, size_limit=_CACHE_SIZE_LIMIT)
+        except Exception as e:
+            logger.warning(f"DB result cache disabled: {e}")
+            _CACHE = False
+    return _CACHE or None
+
+
+def _cache_lookup(cache_key: Optional[Callable[..., Any]], args, kwargs):
+    """Return (key, cached value or _MISS) for a call."""
+    if cache_key is None:
+        return None, _MISS
+    cache = _get_cache()
+    if cache is None:
+        return None, _MISS
+    key = cache_key(*args, **kwargs)
+    return key, cache.get(key, default=_MISS)
+
+
+def _cache_store(key, value, ttl: float) -> None:
+    cache = _get_cache()
+    if key is not None and cache is not None:
+        cache.set(key, value, expire=ttl)
+
+
+def _is_connection_error(e: Exception) -> bool:
+    """Classify a DBAPI error as a transient connection failure worth retrying."""
+    code = getattr(getattr(e, 'orig', None), 'pgcode', None)
+    return code in _CONN_SQLSTATES or _CONN_RE.search(str(e)) is not None
+
+
+def _backoff(attempt: int, delay: float, cap: float, jitter: bool) -> float:
+    """Capped exponential backoff; full jitter spreads concurrent retries apart."""
+    base = min(delay * (1 << attempt), cap)
+    return random.uniform(0, base) if jitter else base
+
+
+def _rollback_sessions(args, kwargs) -> None:
+    """Roll back any Session passed to the wrapped call so the retry starts clean."""
+    for value in (*args, *kwargs.values()):
+        if isinstance(value, Session):
+            try:
+                value.rollback()
+            except Exception:
+                pass
+
+
+def with_db_retry(
+    max_retries: int = 3,
+    delay: float = 0.5,
+    cap: float = 8.0,
+    jitter: bool = True,
+    cache_key: Optional[Callable[..., Any]] = None,
+    ttl: float = 30.0,
+):
     """
     Decorator that retries database operations on connection failures.
     
     Args:
         max_retries: Maximum number of retry attempts
         delay: Initial delay between retries (increases exponentially)
+        cap: Upper bound on a single delay
+        jitter: Sleep a random fraction of the delay so callers that failed
+            together (e.g. during a failover) don't all retry in lockstep
+        cache_key: Optional function of the call arguments; when given, successful
+            results are memoized in a local diskcache for `ttl` seconds.
+            Only use this for read-only, idempotent calls.
+        ttl: Lifetime of a memoized result in seconds
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            key, cached = _cache_lookup(cache_key, args, kwargs)
+            if cached is not _MISS:
+                return cached
+
             last_exception = None
             
             for attempt in range(max_retries + 1):
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    _cache_store(key, result, ttl)
+                    return result
                 except (OperationalError, InterfaceError) as e:
                     last_exception = e
-                    error_msg = str(e)
                     
                     # Check if it's a connection-related error
-                    if any(x in error_msg.lower() for x in [
-                        'connection', 'timeout', 'could not connect',
-                        'server closed', 'connection refused',
-                        'connection reset', 'eof detected'
-                    ]):
+                    if _is_connection_error(e):
                         if attempt < max_retries:
-                            wait_time = delay * (2 ** attempt)  # Exponential backoff
+                            wait_time = _backoff(attempt, delay, cap, jitter)  # Exponential backoff
                             logger.warning(
                                 f"Database connection failed (attempt {attempt + 1}/{max_retries + 1}). "
-                                f"Retrying in {wait_time:.1f}s..."
+                                f"Retrying in {wait_time:.2f}s..."
                             )
                             time.sleep(wait_time)
+                            _rollback_sessions(args, kwargs)
                             continue
                     
                     # Not a connection error or max retries reached
@@ -57,36 +151,45 @@ def with_db_retry(max_retries: int = 3, delay: float = 0.5):
     return decorator
 
 
-async def with_db_retry_async(max_retries: int = 3, delay: float = 0.5):
+def with_db_retry_async(
+    max_retries: int = 3,
+    delay: float = 0.5,
+    cap: float = 8.0,
+    jitter: bool = True,
+    cache_key: Optional[Callable[..., Any]] = None,
+    ttl: float = 30.0,
+):
     """
-    Async version of the retry decorator.
+    Async version of the retry decorator - sleeps with asyncio.sleep so the
+    event loop keeps serving other requests while waiting to retry.
+    Only apply it to idempotent handlers, since the whole call is re-run.
     """
-    import asyncio
-    
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            key, cached = _cache_lookup(cache_key, args, kwargs)
+            if cached is not _MISS:
+                return cached
+
             last_exception = None
             
             for attempt in range(max_retries + 1):
                 try:
-                    return await func(*args, **kwargs)
+                    result = await func(*args, **kwargs)
+                    _cache_store(key, result, ttl)
+                    return result
                 except (OperationalError, InterfaceError) as e:
                     last_exception = e
-                    error_msg = str(e)
                     
-                    if any(x in error_msg.lower() for x in [
-                        'connection', 'timeout', 'could not connect',
-                        'server closed', 'connection refused',
-                        'connection reset', 'eof detected'
-                    ]):
+                    if _is_connection_error(e):
                         if attempt < max_retries:
-                            wait_time = delay * (2 ** attempt)
+                            wait_time = _backoff(attempt, delay, cap, jitter)
                             logger.warning(
                                 f"Database connection failed (attempt {attempt + 1}/{max_retries + 1}). "
-                                f"Retrying in {wait_time:.1f}s..."
+                                f"Retrying in {wait_time:.2f}s..."
                             )
                             await asyncio.sleep(wait_time)
+                            _rollback_sessions(args, kwargs)
                             continue
                     
                     raise
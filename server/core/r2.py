@@ -0,0 +1,46 @@
+"""
+Shared Cloudflare R2 (S3 API) client.
+One client per process: boto3 clients are thread-safe, and building one
+(session, credential and endpoint resolution) costs hundreds of milliseconds.
+"""
+
+from functools import lru_cache
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from core.config import settings
+
+# Room for the scripts' thread pools (up to 32 concurrent calls) and concurrent
+# multipart uploads without waiting on the default 10-connection pool; adaptive
+# retries back off on throttling; keepalive stops idle pooled sockets being dropped
+R2_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'mode': 'adaptive', 'max_attempts': 6},
+    tcp_keepalive=True,
+)
+
+
+# Multipart settings for uploads through the API (upload_fileobj). s3transfer holds
+# up to max_concurrency parts in memory, so this caps the buffer at ~32 MiB
+# per upload - sized for small instances rather than raw throughput.
+R2_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True,
+)
+
+
+@lru_cache(maxsize=1)
+def get_r2_client():
+    """Process-wide R2 client, created on first use."""
+    return boto3.client(
+        service_name='s3',
+        endpoint_url=settings.R2_ENDPOINT_URL,
+        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
+        region_name='auto',  # Cloudflare R2 requires a region, often 'auto' works or 'us-east-1'
+        config=R2_CLIENT_CONFIG,
+    )
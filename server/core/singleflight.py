@@ -0,0 +1,33 @@
+"""
+Single-flight coalescing for async callers.
+Concurrent calls with the same key share one execution: the first caller starts
+the work, everyone awaits its result (the DataLoader pattern).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+_INFLIGHT: Dict[str, asyncio.Task] = {}
+
+
+def _finish(key: str, task: asyncio.Task) -> None:
+    if _INFLIGHT.get(key) is task:
+        del _INFLIGHT[key]
+    if not task.cancelled():
+        task.exception()  # Mark retrieved - every caller may have stopped waiting
+
+
+async def single_flight(key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    """
+    Run `await func(*args, **kwargs)` once per key at a time.
+    The work runs as its own task, not inside the request that started it, so
+    cancelling any caller (leader included, e.g. a client disconnect) only ends
+    that caller's wait; the others still get the result or exception.
+    `func` must therefore not depend on the first caller's request-scoped state.
+    """
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(func(*args, **kwargs))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda t: _finish(key, t))
+    return await asyncio.shield(task)
@@ -1,8 +1,10 @@
 import os
+import time
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from sqlalchemy import text
 import uvicorn
 
 # Configure logging
@@ -22,7 +24,9 @@ except ImportError as e:
 
 from api.v1.endpoints import auth, upload, iri, pothole, vehicle, pavement, presign
 from core.config import settings
-from core.database import engine
+from core.database import engine, keepalive_engine, Base
+from core.db_retry import with_db_retry
+from core.singleflight import single_flight
 from models import user, upload as upload_models
 
 # Create FastAPI app
@@ -38,7 +42,7 @@ cors_origins_str = os.getenv(
     "CORS_ORIGINS", 
     "http://localhost:5173,http://localhost:5174,http://localhost:5175,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:5174"
 )
-origins = [origin.strip() for origin in cors_origins_str.split(",") if origin.strip()]
+origins = tuple(o for o in (s.strip() for s in cors_origins_str.split(",")) if o)
 
 logger.info(f"CORS allowed origins: {origins}")
 
@@ -51,33 +55,44 @@ app.add_middleware(
 )
 
 # Include API routes
-app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
-app.include_router(upload.router, prefix=f"{settings.API_V1_STR}/upload", tags=["upload"])
-app.include_router(iri.router, prefix=f"{settings.API_V1_STR}/iri", tags=["iri"])
-app.include_router(pothole.router, prefix=f"{settings.API_V1_STR}/pothole", tags=["pothole"])
-app.include_router(vehicle.router, prefix=f"{settings.API_V1_STR}/vehicle", tags=["vehicle"])
-app.include_router(pavement.router, prefix=f"{settings.API_V1_STR}/pavement", tags=["pavement"])
-app.include_router(presign.router, prefix=f"{settings.API_V1_STR}/presign", tags=["presign"])
+# Each endpoint router carries its own prefix/tags; mount them all under one v1 router
+api_router = APIRouter(prefix=settings.API_V1_STR)
+for _module in (auth, upload, iri, pothole, vehicle, pavement, presign):
+    api_router.include_router(_module.router)
+app.include_router(api_router)
 
 @app.get("/")
 async def root():
     return {"message": "Project DAAN Express API is running!"}
 
+@with_db_retry(max_retries=1, cache_key=lambda: "health:db_ping", ttl=10)
+def _ping_database() -> str:
+    """SELECT 1 round trip; memoized briefly so probe bursts share one ping."""
+    # Pinned keepalive connection - no Session, no checkout from the main pool
+    with keepalive_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return "connected"
+
+# In-memory fast path in front of the shared diskcache memo: (expires_at, status)
+_HEALTH_TTL = 2.0
+_health_status = (0.0, None)
+
 @app.api_route("/health", methods=["GET", "HEAD"])
 async def health_check():
     """Health check endpoint - also pings database to keep connection warm."""
-    from core.database import SessionLocal
-    from sqlalchemy import text
-    
+    global _health_status
     db_status = "unknown"
-    try:
-        # Quick ping to keep database connection warm
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)[:50]}"
+    expires_at, cached_status = _health_status
+    if cached_status is not None and time.monotonic() < expires_at:
+        db_status = cached_status
+    else:
+        try:
+            # Quick ping to keep database connection warm
+            # Concurrent probes share one ping, which runs off the event loop
+            db_status = await single_flight("health:db_ping", asyncio.to_thread, _ping_database)
+            _health_status = (time.monotonic() + _HEALTH_TTL, db_status)
+        except Exception as e:
+            db_status = f"error: {str(e)[:50]}"
     
     return {
         "status": "healthy", 
@@ -85,31 +100,55 @@ async def health_check():
         "database": db_status
     }
 
-@app.on_event("startup")
-async def startup_event():
-    """Create database tables on startup (with retry for cold starts)."""
-    import time
+async def _init_database():
+    """Create database tables (with retry for cold starts)."""
     max_retries = 3
     
+    def create_tables():
+        # All models share core.database.Base, so one create_all covers every table
+        Base.metadata.create_all(bind=engine, checkfirst=True)
+    
     for attempt in range(max_retries):
         try:
-            user.Base.metadata.create_all(bind=engine)
-            upload_models.Base.metadata.create_all(bind=engine)
+            # Blocking DDL/introspection runs in a thread so the loop stays responsive
+            await asyncio.to_thread(create_tables)
             logger.info("Database tables created/verified successfully")
             return
         except Exception as e:
             logger.warning(f"Database init attempt {attempt + 1}/{max_retries} failed: {e}")
             if attempt < max_retries - 1:
-                time.sleep(5 * (attempt + 1))
+                await asyncio.sleep(min(5 * (1 << attempt), 30))
             else:
                 logger.error("Could not initialize database tables - will retry on first request")
                 # Don't crash - let the app start anyway
 
+_db_init_task = None
+
+@app.on_event("startup")
+async def startup_event():
+    """Kick off table creation without holding up startup."""
+    global _db_init_task
+    # Set SKIP_DB_INIT=1 once the schema exists to skip introspection on warm starts
+    if os.getenv("SKIP_DB_INIT") == "1":
+        logger.info("SKIP_DB_INIT set - skipping table creation")
+        return
+    
+    # Run in the background so the server starts answering /health while a
+    # cold database is still being retried (keep a reference so it isn't GC'd)
+    _db_init_task = asyncio.create_task(_init_database())
+
 if __name__ == "__main__":
+    # Auto-reload only in development (ENV=dev, the default); reload forces a single worker
+    dev_mode = os.getenv("ENV", "dev") == "dev"
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=8000,
-        reload=True,
+        port=int(os.getenv("PORT", "8000")),
+        reload=dev_mode,
+        workers=1 if dev_mode else int(os.getenv("WEB_CONCURRENCY", "1")),
+        # "auto" picks uvloop/httptools (installed by uvicorn[standard]) and falls back
+        # to asyncio/h11 where they're unavailable, e.g. on Windows
+        loop="auto",
+        http="auto",
         log_level="info"
     )
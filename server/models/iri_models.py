@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class IRISegment(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     segment_id: int
     distance_start: float
     distance_end: float
@@ -27,8 +29,10 @@ class IRIComputationResponse(BaseModel):
     segments: List[IRISegment]
     processing_time: float
     sampling_rate: float
-    raw_data: Optional[List[dict]] = None
-    filtered_data: Optional[List[dict]] = None
+    # Chart series in columnar form: {"time": [...], "ax": [...], ...} - field names
+    # once per series instead of once per point (the client zips them into rows)
+    raw_data: Optional[Dict[str, List[float]]] = None
+    filtered_data: Optional[Dict[str, List[float]]] = None
 
 class FileUploadResponse(BaseModel):
     success: bool
@@ -43,3 +47,7 @@ class ErrorResponse(BaseModel):
     success: bool = False
     error: str
     details: Optional[str] = None
+
+
+# Whole-list validator - one pydantic-core call instead of IRISegment(**row) per segment
+iri_segments_adapter = TypeAdapter(List[IRISegment])
@@ -1,11 +1,33 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+import numpy as np
+from pydantic import BaseModel, ConfigDict, TypeAdapter, BeforeValidator, PlainSerializer, WithJsonSchema
+from typing import Annotated, List, Optional, Dict, Any
+
+
+def _to_latlon_array(value) -> np.ndarray:
+    return np.asarray(value, dtype=np.float32).reshape(-1, 2)
+
+
+def _latlon_to_list(points: np.ndarray) -> List[List[float]]:
+    # Round back to float32 precision so the JSON doesn't carry float64 widening noise
+    return np.round(points.astype(np.float64), 6).tolist()
+
+
+# Polyline vertices held as one contiguous (N, 2) float32 array [lat, lon]
+# instead of N two-element lists; still serialized as [[lat, lon], ...]
+LatLonArray = Annotated[
+    np.ndarray,
+    BeforeValidator(_to_latlon_array),
+    PlainSerializer(_latlon_to_list, return_type=List[List[float]]),
+    WithJsonSchema({"type": "array", "items": {"type": "array", "items": {"type": "number"}, "minItems": 2, "maxItems": 2}}),
+]
 
 class MapPoint(BaseModel):
     lat: float
     lon: float
 
 class VehicleMarker(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     lat: float
     lon: float
     vehicle_type: str
@@ -16,6 +38,8 @@ class VehicleMarker(BaseModel):
     icon: str
 
 class PotholeMarker(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     lat: float
     lon: float
     confidence: float
@@ -25,7 +49,9 @@ class PotholeMarker(BaseModel):
     tooltip: str
 
 class PavementSegment(BaseModel):
-    points: List[List[float]]  # [[lat, lon], [lat, lon], ...]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    points: LatLonArray  # (N, 2) float32, serialized as [[lat, lon], ...]
     type: str
     color: str
 
@@ -43,3 +69,8 @@ class PotholeMappingResponse(MappingResponse):
 
 class PavementMappingResponse(MappingResponse):
     data: List[PavementSegment]
+
+
+# Whole-list validators - one pydantic-core call per batch instead of Model(**row) per marker
+vehicle_markers_adapter = TypeAdapter(List[VehicleMarker])
+pothole_markers_adapter = TypeAdapter(List[PotholeMarker])
@@ -1,37 +1,47 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Boolean, Column, Enum, Integer, String, DateTime, ForeignKey, Float, Text, LargeBinary
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from core.database import Base
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Literal, get_args
 from datetime import datetime
 
 # SQLAlchemy Models
-from sqlalchemy import Index
+from sqlalchemy import Index, UniqueConstraint
+
+# Valid upload categories (stored as the upload_category enum). Endpoints take
+# UploadCategory so unknown values are rejected before they reach the ORM.
+UploadCategory = Literal["pothole", "iri", "vehicle", "pavement"]
+UPLOAD_CATEGORIES = list(get_args(UploadCategory))
 
 class UploadModel(Base):
     __tablename__ = "uploads"
     
     # Composite index for the image proxy lookup
     # Improves: db.query(UploadModel).filter(category='pothole', original_filename=filename)
+    # One row per (user, content hash) - lets inserts dedup with ON CONFLICT
     __table_args__ = (
         Index('idx_pothole_lookup', 'category', 'original_filename'),
+        UniqueConstraint('user_id', 'file_hash', name='uq_user_filehash'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     filename = Column(String, nullable=False)
-    filename = Column(String, nullable=False)
     original_filename = Column(String, nullable=False, index=True) # Added index for fast proxy lookup
     file_type = Column(String, nullable=False)  # csv, jpg, png, etc.
-    file_type = Column(String, nullable=False)  # csv, jpg, png, etc.
-    category = Column(String, nullable=False, index=True)  # pothole, iri, vehicle
+    category = Column(
+        Enum(*UPLOAD_CATEGORIES, name="upload_category", validate_strings=True),
+        nullable=False, index=True
+    )  # Native PG enum; existing databases: run scripts/convert_enum_columns.py
     storage_path = Column(String, nullable=False)  # Path in storage (local or R2)
     file_size = Column(Integer, nullable=False)  # Size in bytes
     file_hash = Column(String, nullable=True, index=True)  # MD5/SHA256 hash for deduplication
-    upload_date = Column(DateTime, default=datetime.utcnow, nullable=False)
+    upload_date = Column(DateTime, server_default=func.now(), nullable=False)  # Stamped by the database
     
     # Cached processed data (for fast loading)
     cached_data = Column(Text, nullable=True)  # Cached processed JSON response
+    cached_data_gz = Column(LargeBinary, nullable=True)  # Gzipped cached JSON (see utils.response_cache)
     cache_timestamp = Column(DateTime, nullable=True)  # When cache was created
     
     # Relationships
@@ -39,15 +49,54 @@ class UploadModel(Base):
     pothole_images = relationship("PotholeImageModel", back_populates="upload", cascade="all, delete-orphan")
 
 
+# Partial indexes for the vehicle "latest upload by name" lookup
+# Each branch of the (filename | original_filename) match gets its own index so the
+# planner can satisfy ORDER BY upload_date DESC LIMIT 1 with an index scan.
+# Existing databases: run scripts/add_vehicle_lookup_indexes.py
+_vehicle_csv_only = (UploadModel.category == 'vehicle') & (UploadModel.file_type == 'csv')
+
+Index(
+    'idx_vehicle_lookup_filename',
+    UploadModel.category, UploadModel.file_type, UploadModel.filename,
+    UploadModel.upload_date.desc().nulls_last(),
+    postgresql_where=_vehicle_csv_only,
+    sqlite_where=_vehicle_csv_only,
+)
+Index(
+    'idx_vehicle_lookup_original_filename',
+    UploadModel.category, UploadModel.file_type, UploadModel.original_filename,
+    UploadModel.upload_date.desc().nulls_last(),
+    postgresql_where=_vehicle_csv_only,
+    sqlite_where=_vehicle_csv_only,
+)
+
+
+# Pothole lookups: a user's images by name, and a user's latest pothole CSV
+# (upload filtering, /pothole/process image map, scripts/debug_mapping_*)
+# Existing databases: run scripts/add_pothole_lookup_indexes.py
+Index(
+    'idx_uploads_user_cat_ftype_orig',
+    UploadModel.user_id, UploadModel.category, UploadModel.file_type, UploadModel.original_filename,
+)
+_pothole_csv_only = (UploadModel.category == 'pothole') & (UploadModel.file_type == 'csv')
+
+Index(
+    'idx_uploads_latest_pothole_csv',
+    UploadModel.user_id, UploadModel.upload_date.desc(),
+    postgresql_where=_pothole_csv_only,
+    sqlite_where=_pothole_csv_only,
+)
+
+
 class PotholeImageModel(Base):
     __tablename__ = "pothole_images"
 
     id = Column(Integer, primary_key=True, index=True)
-    upload_id = Column(Integer, ForeignKey("uploads.id"), nullable=False, index=True)
+    upload_id = Column(Integer, ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False, index=True)  # see scripts/add_pothole_images_fk_cascade.py
     image_path = Column(String, nullable=False)  # Path to image in storage
     frame_number = Column(Integer, nullable=True)  # Frame number from CSV
     detection_confidence = Column(Float, nullable=True)  # Detection confidence score
-    upload_date = Column(DateTime, default=datetime.utcnow, nullable=False)
+    upload_date = Column(DateTime, server_default=func.now(), nullable=False)  # Stamped by the database
     
     # Relationships
     upload = relationship("UploadModel", back_populates="pothole_images")
@@ -61,12 +110,11 @@ class PotholeImageBase(BaseModel):
 
 
 class PotholeImage(PotholeImageBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     upload_id: int
     upload_date: datetime
-    
-    class Config:
-        from_attributes = True
 
 
 class UploadBase(BaseModel):
@@ -83,14 +131,13 @@ class UploadCreate(UploadBase):
 
 
 class Upload(UploadBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     user_id: int
     storage_path: str
     upload_date: datetime
     pothole_images: List[PotholeImage] = []
-    
-    class Config:
-        from_attributes = True
 
 
 class UploadResponse(BaseModel):
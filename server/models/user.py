@@ -1,7 +1,7 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import Boolean, Column, Enum, Integer, String
 from sqlalchemy.orm import relationship
 from core.database import Base
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional, Literal
 
 # Valid roles in the system
@@ -18,7 +18,12 @@ class UserModel(Base):
     hashed_password = Column(String, nullable=True)  # Nullable for Clerk-only users
     is_active = Column(Boolean, default=True)
     # Role field: "superuser" (owner), "admin" (can upload), "user" (read-only)
-    role = Column(String, default="user")
+    # Native PG enum (4-byte on disk/in indexes); VARCHAR + CHECK on SQLite
+    # Existing databases: run scripts/convert_enum_columns.py
+    role = Column(
+        Enum(*VALID_ROLES, name="user_role", validate_strings=True),
+        default="user", nullable=False
+    )
     
     # Backwards compatibility property
     @property
@@ -43,15 +48,14 @@ class UserCreate(UserBase):
     password: str
 
 class User(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     
     # Computed field for backwards compatibility
     @property
     def is_superuser(self) -> bool:
         return self.role == "superuser"
-    
-    class Config:
-        from_attributes = True
 
 class Token(BaseModel):
     access_token: str
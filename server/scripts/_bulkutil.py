@@ -0,0 +1,31 @@
+"""
+Batched inserts for the maintenance/debug scripts.
+One executemany per chunk of rows instead of an ORM flush (or commit) per object.
+
+Review rule: a loop doing `db.add(obj); db.commit()` (or `conn.execute(insert, row)`)
+per row should be rewritten to collect the rows and call bulk_insert once.
+"""
+
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import Table
+from sqlalchemy.engine import Connection
+
+BULK_CHUNK_SIZE = 1000
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+def bulk_insert(conn: Connection, table: Table, rows: Iterable[dict], chunk: int = BULK_CHUNK_SIZE) -> int:
+    """
+    Insert `rows` (dicts keyed by column name) in chunks of `chunk`; returns the row count.
+    Runs on the caller's connection, so the caller owns the transaction.
+    """
+    inserted = 0
+    for chunk_rows in _chunks(rows, chunk):
+        conn.execute(table.insert(), chunk_rows)
+        inserted += len(chunk_rows)
+    return inserted
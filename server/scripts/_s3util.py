@@ -0,0 +1,249 @@
+"""
+Shared R2/S3 listing helpers for the maintenance scripts.
+Listing is network-bound, so sub-prefixes are fanned out across threads
+(boto3 clients are thread-safe).
+"""
+
+import codecs
+import csv
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import chain
+from typing import Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+MAX_WORKERS = 32
+
+# Parallel DeleteObjects calls; in-flight pages are capped so memory stays flat
+DELETE_WORKERS = 16
+MAX_DELETES_IN_FLIGHT = DELETE_WORKERS * 2
+
+def _iter_level(s3, bucket: str, prefix: str, delimiter: Optional[str], sub_prefixes: List[str]) -> Iterator[dict]:
+    """
+    Objects directly under `prefix`, yielded page by page as the pages arrive
+    (stopping early skips the remaining pages); sub-prefixes go into `sub_prefixes`.
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    params = {'Bucket': bucket, 'Prefix': prefix}
+    if delimiter:
+        params['Delimiter'] = delimiter
+    
+    for page in paginator.paginate(**params):
+        sub_prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        yield from page.get('Contents', [])
+
+def _list_level(s3, bucket: str, prefix: str, delimiter: Optional[str]) -> Tuple[List[dict], List[str]]:
+    """All objects directly under `prefix` plus its sub-prefixes, across every page."""
+    sub_prefixes = []
+    objects = list(_iter_level(s3, bucket, prefix, delimiter, sub_prefixes))
+    return objects, sub_prefixes
+
+def iter_objects(s3, bucket: str, prefix: str = "", delimiter: Optional[str] = '/') -> Iterator[dict]:
+    """
+    Yield every object (list_objects_v2 'Contents' entry) under `prefix`, past the
+    1000-key page limit. With a delimiter, each level's sub-prefixes are listed
+    concurrently; pass delimiter=None for a single flat listing.
+    """
+    # The top level streams, so a capped caller (islice) only lists what it consumes;
+    # deeper levels are listed whole on the pool threads
+    frontier = []
+    yield from _iter_level(s3, bucket, prefix, delimiter, frontier)
+    if not frontier:
+        return
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while frontier:
+            next_frontier = []
+            for objects, sub_prefixes in pool.map(lambda p: _list_level(s3, bucket, p, delimiter), frontier):
+                yield from objects
+                next_frontier.extend(sub_prefixes)
+            frontier = next_frontier
+
+def iter_keys(s3, bucket: str, prefix: str = "", delimiter: Optional[str] = '/') -> Iterator[str]:
+    """Same as iter_objects, keys only."""
+    for obj in iter_objects(s3, bucket, prefix, delimiter):
+        yield obj['Key']
+
+# Generous upper bound for a CSV header plus a handful of rows
+HEAD_BYTES = 1 << 20  # 1 MiB
+
+def read_csv_head(s3, bucket: str, key: str, nrows: int = 5):
+    """
+    First `nrows` rows of a CSV object, fetched with a ranged GET so only the
+    start of the file crosses the network (R2 has no S3 Select).
+    """
+    import pandas as pd  # imported here so listing/deleting scripts skip its import cost
+
+    obj = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{HEAD_BYTES - 1}")
+    try:
+        return pd.read_csv(obj['Body'], nrows=nrows)
+    finally:
+        obj['Body'].close()
+
+def read_csv_column(s3, bucket: str, key: str, column: str):
+    """
+    One column of a CSV object as an Arrow ChunkedArray, or None if the CSV has
+    no such column. Arrow's reader is multithreaded and builds native string
+    arrays, so no per-row Python objects are created for the other columns.
+    """
+    import pyarrow.csv as pacsv  # imported here, like pandas above
+
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    try:
+        table = pacsv.read_csv(obj['Body'], convert_options=pacsv.ConvertOptions(include_columns=[column]))
+    except KeyError:
+        # ArrowKeyError - column not in the header
+        return None
+    finally:
+        obj['Body'].close()
+    return table.column(column)
+
+def read_csv_unique(s3, bucket: str, key: str, column: str) -> Optional[List[str]]:
+    """
+    Distinct non-empty values of one CSV column (first-seen order), or None if
+    the column is missing. Streams rows through the stdlib csv module, so
+    neither pandas nor pyarrow has to be imported for a single string column.
+    """
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    try:
+        # utf-8-sig drops the BOM Excel puts in front of the first header
+        reader = csv.DictReader(codecs.getreader('utf-8-sig')(obj['Body']))
+        if column not in (reader.fieldnames or []):
+            return None
+        return list(dict.fromkeys(row[column] for row in reader if row.get(column)))
+    finally:
+        obj['Body'].close()
+
+# DeleteObjects accepts at most this many keys per call
+DELETE_BATCH_SIZE = 1000
+
+def _delete_page(s3, bucket: str, objects: List[dict]) -> int:
+    """
+    Delete up to 1000 objects ({'Key': ...} or {'Key': ..., 'VersionId': ...})
+    in one DeleteObjects call; returns the number deleted.
+    """
+    response = s3.delete_objects(
+        Bucket=bucket,
+        Delete={'Objects': objects, 'Quiet': True}
+    )
+    errors = response.get('Errors', [])
+    for err in errors[:5]:
+        print(f"  Failed to delete {err.get('Key')}: {err.get('Message')}")
+    return len(objects) - len(errors)
+
+def _object_pages(s3, bucket: str, prefix: str) -> Iterator[List[dict]]:
+    """Current objects under `prefix`, one list of delete identifiers per listed page."""
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+
+def _version_pages(s3, bucket: str, prefix: str) -> Iterator[List[dict]]:
+    """
+    Every object version and delete marker under `prefix`. A page can carry up
+    to 1000 of each, so it is split to stay within the DeleteObjects limit.
+    """
+    paginator = s3.get_paginator('list_object_versions')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        entries = [
+            {'Key': v['Key'], 'VersionId': v['VersionId']}
+            for v in page.get('Versions', []) + page.get('DeleteMarkers', [])
+        ]
+        for i in range(0, len(entries), DELETE_BATCH_SIZE):
+            yield entries[i:i + DELETE_BATCH_SIZE]
+
+class DeletePrefixError(Exception):
+    """delete_prefix failed part-way; `deleted` objects were removed before the error."""
+
+    def __init__(self, deleted: int, cause: Exception):
+        super().__init__(str(cause))
+        self.deleted = deleted
+
+def delete_prefix(s3, bucket: str, prefix: str = "", all_versions: bool = False) -> int:
+    """
+    Delete every object under `prefix` (the whole bucket by default); returns the count.
+    Each listed page (<= 1000 keys) becomes one DeleteObjects call, fanned out
+    across a thread pool while the paginator keeps listing.
+    With all_versions=True, old versions and delete markers are removed too, so a
+    versioned bucket ends up really empty; stores without ListObjectVersions
+    (R2 answers NotImplemented) fall back to the plain listing.
+    Failures after the first batch raise DeletePrefixError with the running count.
+    """
+    pages = _version_pages(s3, bucket, prefix) if all_versions else _object_pages(s3, bucket, prefix)
+    try:
+        first = next(pages, None)
+    except ClientError as e:
+        if not all_versions or e.response.get('Error', {}).get('Code') != 'NotImplemented':
+            raise
+        pages = _object_pages(s3, bucket, prefix)
+        first = next(pages, None)
+    if first is None:
+        return 0
+
+    deleted = 0
+    pending = set()
+
+    def settle(futures) -> None:
+        # Count every finished batch before surfacing the first failure
+        nonlocal deleted
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        deleted += sum(f.result() for f in futures if f.exception() is None)
+        if errors:
+            raise errors[0]
+
+    try:
+        with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as pool:
+            for objects in chain([first], pages):
+                if not objects:
+                    continue
+                if len(pending) >= MAX_DELETES_IN_FLIGHT:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    settle(done)
+                pending.add(pool.submit(_delete_page, s3, bucket, objects))
+            done, pending = wait(pending)
+            settle(done)
+    except Exception as e:
+        # Leaving the pool waited for the batches still in flight - count those too
+        deleted += sum(f.result() for f in pending if f.exception() is None)
+        raise DeletePrefixError(deleted, e) from e
+    return deleted
+
+def _lifecycle_rules(s3, bucket: str) -> List[dict]:
+    """Current lifecycle rules of the bucket ([] when it has none)."""
+    try:
+        return s3.get_bucket_lifecycle_configuration(Bucket=bucket).get('Rules', [])
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'NoSuchLifecycleConfiguration':
+            return []
+        raise
+
+def _put_lifecycle_rules(s3, bucket: str, rules: List[dict]) -> None:
+    if rules:
+        s3.put_bucket_lifecycle_configuration(Bucket=bucket, LifecycleConfiguration={'Rules': rules})
+    else:
+        s3.delete_bucket_lifecycle(Bucket=bucket)
+
+def set_expiry_rule(s3, bucket: str, rule_id: str, prefix: str, days: int = 1) -> None:
+    """
+    Install (or replace) a lifecycle rule expiring everything under `prefix` after
+    `days` - the store deletes the objects itself, no listing or delete calls.
+    The put replaces the whole lifecycle config, so other rules are carried over.
+    NOTE: the rule also expires objects uploaded under `prefix` later - remove it
+    with remove_expiry_rule once the purge is done.
+    """
+    rules = [r for r in _lifecycle_rules(s3, bucket) if r.get('ID') != rule_id]
+    rules.append({
+        'ID': rule_id,
+        'Filter': {'Prefix': prefix},
+        'Status': 'Enabled',
+        'Expiration': {'Days': days},
+    })
+    _put_lifecycle_rules(s3, bucket, rules)
+
+def remove_expiry_rule(s3, bucket: str, rule_id: str) -> bool:
+    """Drop the lifecycle rule `rule_id`, keeping any others; returns whether it existed."""
+    rules = _lifecycle_rules(s3, bucket)
+    remaining = [r for r in rules if r.get('ID') != rule_id]
+    if len(remaining) == len(rules):
+        return False
+    _put_lifecycle_rules(s3, bucket, remaining)
+    return True
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the gzipped cache column to uploads table.
+The model maps cached_data_gz as a regular column, so every uploads query selects
+it and fails (UndefinedColumn) until it exists - create_all doesn't add columns.
+Run this once BEFORE deploying the new code.
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from sqlalchemy import text
+
+def migrate():
+    print("Adding cached_data_gz column to uploads table...")
+    
+    with engine.connect() as conn:
+        # Check if column already exists
+        result = conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = 'uploads' AND column_name = 'cached_data_gz'
+        """))
+        
+        if result.fetchone():
+            print("cached_data_gz column already exists. Skipping.")
+            return
+        
+        try:
+            conn.execute(text("ALTER TABLE uploads ADD COLUMN cached_data_gz BYTEA"))
+            conn.commit()
+            print("✅ Successfully added cached_data_gz column!")
+        except Exception as e:
+            print(f"Error adding column: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to make pothole_images.upload_id ON DELETE CASCADE.
+Deleting an upload row then removes its pothole_images links in the same statement,
+so bulk deletes (e.g. wipe_potholes) need no separate child DELETE.
+PostgreSQL only - SQLite can't alter a foreign key in place (and dev runs without FK enforcement).
+Run this once after deploying the new code.
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from sqlalchemy import text
+
+def migrate():
+    if engine.dialect.name != "postgresql":
+        print("Skipping: ON DELETE CASCADE migration is PostgreSQL-only.")
+        return
+    
+    print("Recreating pothole_images.upload_id foreign key with ON DELETE CASCADE...")
+    
+    with engine.connect() as conn:
+        # Look up the existing constraint name rather than assuming the default
+        fk_names = conn.execute(text("""
+            SELECT tc.constraint_name
+            FROM information_schema.table_constraints tc
+            JOIN information_schema.key_column_usage kcu
+              ON tc.constraint_name = kcu.constraint_name AND tc.table_name = kcu.table_name
+            WHERE tc.table_name = 'pothole_images'
+              AND tc.constraint_type = 'FOREIGN KEY'
+              AND kcu.column_name = 'upload_id'
+        """)).scalars().all()
+        
+        try:
+            # Drop + re-add in one transaction so the table is never without the FK
+            for name in fk_names:
+                conn.execute(text(f'ALTER TABLE pothole_images DROP CONSTRAINT "{name}"'))
+            conn.execute(text("""
+                ALTER TABLE pothole_images
+                ADD CONSTRAINT pothole_images_upload_id_fkey
+                FOREIGN KEY (upload_id) REFERENCES uploads(id) ON DELETE CASCADE
+            """))
+            conn.commit()
+            print("✅ Successfully added ON DELETE CASCADE to pothole_images.upload_id!")
+        except Exception as e:
+            conn.rollback()
+            print(f"Error recreating foreign key: {e}")
+
+if __name__ == "__main__":
+    migrate()
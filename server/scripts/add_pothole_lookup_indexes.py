@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the pothole lookup indexes to the uploads table.
+Built CONCURRENTLY so uploads keep working while the indexes are created.
+Run this once after deploying the new code (new databases get them from create_all).
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from sqlalchemy import text
+
+INDEXES = {
+    "idx_uploads_user_cat_ftype_orig": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_uploads_user_cat_ftype_orig
+        ON uploads (user_id, category, file_type, original_filename)
+    """,
+    "idx_uploads_latest_pothole_csv": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_uploads_latest_pothole_csv
+        ON uploads (user_id, upload_date DESC)
+        WHERE category = 'pothole' AND file_type = 'csv'
+    """,
+}
+
+def migrate():
+    print("Adding pothole lookup indexes to uploads table...")
+    
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, ddl in INDEXES.items():
+            try:
+                conn.execute(text(ddl))
+                print(f"✅ {name} created (or already present)")
+            except Exception as e:
+                print(f"Error creating {name}: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Migration script to let the database stamp upload_date on uploads and pothole_images.
+The models now use server_default=now() instead of a Python-side default,
+so existing tables need the column default added.
+Run this once BEFORE deploying the new code.
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from sqlalchemy import text
+
+TABLES = ["uploads", "pothole_images"]
+
+def migrate():
+    print("Setting upload_date defaults...")
+    
+    with engine.connect() as conn:
+        for table in TABLES:
+            try:
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN upload_date SET DEFAULT now()"))
+                conn.commit()
+                print(f"✅ {table}.upload_date now defaults to now()")
+            except Exception as e:
+                conn.rollback()
+                print(f"Error updating {table}: {e}")
+
+if __name__ == "__main__":
+    migrate()
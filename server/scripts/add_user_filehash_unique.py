@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the (user_id, file_hash) unique constraint to uploads table.
+Refuses to run while duplicate rows exist - pass --dedupe to keep the oldest row of
+each duplicated pair (pothole images are re-pointed to it) and delete the rest.
+SQLite can't ALTER TABLE ADD CONSTRAINT, so there a unique index of the same name is
+created instead (ON CONFLICT accepts either).
+Run this once BEFORE deploying the new code. Until it has run, /presign/register falls
+back to the slower SELECT-then-INSERT path.
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from sqlalchemy import text
+
+# Oldest row per duplicated (user_id, file_hash) pair
+KEEP_IDS_SQL = """
+    SELECT MIN(id) FROM uploads
+    WHERE file_hash IS NOT NULL
+    GROUP BY user_id, file_hash
+"""
+
+def dedupe(conn):
+    print("Removing duplicate uploads (keeping the oldest of each pair)...")
+    conn.execute(text(f"""
+        UPDATE pothole_images SET upload_id = (
+            SELECT MIN(keep.id) FROM uploads keep, uploads dup
+            WHERE dup.id = pothole_images.upload_id
+              AND keep.user_id = dup.user_id AND keep.file_hash = dup.file_hash
+        )
+        WHERE upload_id IN (
+            SELECT id FROM uploads WHERE file_hash IS NOT NULL AND id NOT IN ({KEEP_IDS_SQL})
+        )
+    """))
+    removed = conn.execute(text(f"""
+        SELECT id, storage_path FROM uploads
+        WHERE file_hash IS NOT NULL AND id NOT IN ({KEEP_IDS_SQL})
+    """)).fetchall()
+    conn.execute(text(f"""
+        DELETE FROM uploads
+        WHERE file_hash IS NOT NULL AND id NOT IN ({KEEP_IDS_SQL})
+    """))
+    conn.commit()
+    print(f"✅ Removed {len(removed)} duplicate rows. Their stored objects are now orphaned:")
+    for upload_id, storage_path in removed:
+        print(f"   {upload_id}: {storage_path}")
+
+def migrate(remove_duplicates: bool = False):
+    print("Adding uq_user_filehash constraint to uploads table...")
+    
+    with engine.connect() as conn:
+        duplicates = conn.execute(text("""
+            SELECT user_id, file_hash, COUNT(*) 
+            FROM uploads 
+            WHERE file_hash IS NOT NULL 
+            GROUP BY user_id, file_hash 
+            HAVING COUNT(*) > 1
+        """)).fetchall()
+        
+        if duplicates:
+            print(f"❌ Found {len(duplicates)} duplicated (user_id, file_hash) pairs:")
+            for user_id, file_hash, count in duplicates:
+                print(f"   user {user_id}: {file_hash} x{count}")
+            if not remove_duplicates:
+                print("Re-run with --dedupe to remove them.")
+                return
+            dedupe(conn)
+        
+        try:
+            if engine.dialect.name == "sqlite":
+                conn.execute(text("CREATE UNIQUE INDEX uq_user_filehash ON uploads (user_id, file_hash)"))
+            else:
+                conn.execute(text("ALTER TABLE uploads ADD CONSTRAINT uq_user_filehash UNIQUE (user_id, file_hash)"))
+            conn.commit()
+            print("✅ Successfully added uq_user_filehash!")
+        except Exception as e:
+            print(f"Error adding constraint (may already exist): {e}")
+
+if __name__ == "__main__":
+    migrate(remove_duplicates="--dedupe" in sys.argv)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the vehicle lookup indexes to the uploads table.
+Run this once after deploying the new code (new databases get them from create_all).
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from sqlalchemy import text
+
+INDEXES = {
+    "idx_vehicle_lookup_filename": """
+        CREATE INDEX IF NOT EXISTS idx_vehicle_lookup_filename
+        ON uploads (category, file_type, filename, upload_date DESC NULLS LAST)
+        WHERE category = 'vehicle' AND file_type = 'csv'
+    """,
+    "idx_vehicle_lookup_original_filename": """
+        CREATE INDEX IF NOT EXISTS idx_vehicle_lookup_original_filename
+        ON uploads (category, file_type, original_filename, upload_date DESC NULLS LAST)
+        WHERE category = 'vehicle' AND file_type = 'csv'
+    """,
+}
+
+def migrate():
+    print("Adding vehicle lookup indexes to uploads table...")
+    
+    with engine.connect() as conn:
+        for name, ddl in INDEXES.items():
+            try:
+                conn.execute(text(ddl))
+                conn.commit()
+                print(f"✅ {name} created (or already present)")
+            except Exception as e:
+                conn.rollback()
+                print(f"Error creating {name}: {e}")
+
+if __name__ == "__main__":
+    migrate()
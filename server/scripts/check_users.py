@@ -1,13 +1,12 @@
 
 import sys
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.config import settings
+from core.database import engine
 
 def check_users():
-    engine = create_engine(settings.DATABASE_URL)
     with engine.connect() as conn:
         result = conn.execute(text("SELECT id, email, is_superuser FROM users")).fetchall()
         print(f"Total Users: {len(result)}")
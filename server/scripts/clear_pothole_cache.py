@@ -6,8 +6,9 @@ from pathlib import Path
 current_dir = Path(__file__).resolve().parent
 sys.path.append(str(current_dir.parent))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from core.config import settings
+from core.database import engine
 
 def clear_pothole_cache():
     """
@@ -15,13 +16,12 @@ def clear_pothole_cache():
     This forces the backend to re-calculate URLs using the current R2 configuration.
     """
     print(f"Connecting to database: {settings.DATABASE_URL}")
-    engine = create_engine(settings.DATABASE_URL)
     
     with engine.connect() as connection:
         # Update statement to clear cache for pothole CSVs
         query = text("""
             UPDATE uploads 
-            SET cached_data = NULL 
+            SET cached_data = NULL, cached_data_gz = NULL 
             WHERE category = 'pothole' AND file_type = 'csv';
         """)
         
@@ -1,33 +1,28 @@
 
 import sys
 import os
-import boto3
 
 # Add parent directory to path so we can import core.config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.config import settings
+from core.r2 import get_r2_client
+from _s3util import delete_prefix, DeletePrefixError
 
 def clear_bucket():
     bucket_name = settings.R2_BUCKET_NAME
     print(f"Connecting to R2 Bucket: {bucket_name}...")
     
-    s3 = boto3.resource(
-        service_name='s3',
-        endpoint_url=settings.R2_ENDPOINT_URL,
-        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-        region_name='auto'
-    )
-    
-    bucket = s3.Bucket(bucket_name)
+    client = get_r2_client()
     
     print("Listing and deleting all objects (this may take a moment)...")
-    # Efficiently delete all objects
-    # Note: versioned buckets require a different approach, but assuming standard here.
+    # Paginated listing feeding parallel 1000-key DeleteObjects batches (see _s3util).
+    # all_versions also clears old versions/delete markers if the bucket is versioned.
     try:
-        bucket.objects.all().delete()
-        print("All objects deleted successfully.")
+        deleted = delete_prefix(client, bucket_name, all_versions=True)
+        print(f"All objects deleted successfully ({deleted} objects).")
+    except DeletePrefixError as e:
+        print(f"Error deleting objects: {e} ({e.deleted} deleted before the error)")
     except Exception as e:
         print(f"Error deleting objects: {e}")
 
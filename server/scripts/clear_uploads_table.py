@@ -1,14 +1,14 @@
 
 import sys
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import settings
+from core.database import engine
 
 def clear_tables():
     print(f"Connecting to database: {settings.DATABASE_URL}")
-    engine = create_engine(settings.DATABASE_URL)
     
     with engine.connect() as connection:
         print("Clearing 'pothole_images' and 'uploads' tables...")
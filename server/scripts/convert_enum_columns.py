@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert users.role and uploads.category from VARCHAR
+to the native PostgreSQL enums user_role and upload_category.
+Refuses to run while rows hold values outside the enum - fix those first.
+Run this once after deploying the new code.
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import engine
+from models.user import VALID_ROLES
+from models.upload import UPLOAD_CATEGORIES
+from sqlalchemy import text
+from add_vehicle_lookup_indexes import INDEXES as VEHICLE_LOOKUP_INDEXES
+from add_pothole_lookup_indexes import INDEXES as POTHOLE_LOOKUP_INDEXES
+
+# (table, column, enum type, allowed values)
+CONVERSIONS = [
+    ("users", "role", "user_role", VALID_ROLES),
+    ("uploads", "category", "upload_category", UPLOAD_CATEGORIES),
+]
+
+# Partial indexes with a WHERE on a converted column. ALTER ... TYPE rewrites their
+# predicates with ::text casts that enum-typed queries no longer match, so they are
+# dropped before the change and rebuilt from their original DDL in the same transaction.
+PARTIAL_INDEXES = {
+    ("uploads", "category"): {
+        **VEHICLE_LOOKUP_INDEXES,
+        # CONCURRENTLY isn't allowed inside the transaction
+        "idx_uploads_latest_pothole_csv":
+            POTHOLE_LOOKUP_INDEXES["idx_uploads_latest_pothole_csv"].replace("CONCURRENTLY ", ""),
+    },
+}
+
+def _existing_indexes(conn, table: str) -> dict:
+    """Index name -> definition for every index on `table`."""
+    rows = conn.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :table"
+    ), {"table": table}).all()
+    return dict(rows)
+
+def _rebuild_indexes(conn, ddl_by_name: dict):
+    for name, ddl in ddl_by_name.items():
+        conn.execute(text(ddl))
+        print(f"✅ Rebuilt partial index {name}")
+
+def migrate():
+    if engine.dialect.name != "postgresql":
+        print("Not a PostgreSQL database - enums are plain VARCHAR there. Nothing to do.")
+        return
+    
+    with engine.connect() as conn:
+        # Roles default to "user"; make that explicit before the column turns NOT NULL
+        conn.execute(text("UPDATE users SET role = 'user' WHERE role IS NULL"))
+        
+        for table, column, enum_type, values in CONVERSIONS:
+            print(f"Converting {table}.{column} to {enum_type}...")
+            
+            current_type = conn.execute(text("""
+                SELECT udt_name FROM information_schema.columns 
+                WHERE table_name = :table AND column_name = :column
+            """), {"table": table, "column": column}).scalar()
+            
+            partial = PARTIAL_INDEXES.get((table, column), {})
+            existing = _existing_indexes(conn, table)
+            
+            if current_type == enum_type:
+                # Converted by an earlier run that left text-cast predicates behind
+                stale = {name: ddl for name, ddl in partial.items() if f"({column})::text" in existing.get(name, "")}
+                for name in stale:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                _rebuild_indexes(conn, stale)
+                print(f"{table}.{column} is already {enum_type}. Skipping.")
+                continue
+            
+            invalid = conn.execute(text(f"""
+                SELECT DISTINCT {column} FROM {table} 
+                WHERE {column} IS NOT NULL AND {column} <> ALL(:values)
+            """), {"values": list(values)}).scalars().all()
+            
+            if invalid:
+                print(f"❌ {table}.{column} has values outside {enum_type}: {invalid}")
+                print("Fix those rows and re-run.")
+                conn.rollback()
+                return
+            
+            labels = ", ".join(f"'{v}'" for v in values)
+            conn.execute(text(f"""
+                DO $$ BEGIN
+                    CREATE TYPE {enum_type} AS ENUM ({labels});
+                EXCEPTION WHEN duplicate_object THEN NULL;
+                END $$;
+            """))
+            rebuild = {name: ddl for name, ddl in partial.items() if name in existing}
+            for name in rebuild:
+                conn.execute(text(f"DROP INDEX {name}"))
+            
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT"))
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {enum_type} USING {column}::{enum_type}"
+            ))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+            _rebuild_indexes(conn, rebuild)
+            print(f"✅ {table}.{column} converted to {enum_type}")
+        
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
@@ -1,12 +1,11 @@
 
 import sys
 import os
-import boto3
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import settings
+from core.r2 import get_r2_client
+from core.database import SessionLocal
 from models.upload import UploadModel
 from models.user import UserModel
 
@@ -14,9 +13,7 @@ FILENAME = "45f841b7-ec02-4eb0-a228-628676cadae9.csv"
 
 def debug_file():
     print(f"Checking DB for: {FILENAME}")
-    engine = create_engine(settings.DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    db = Session()
+    db = SessionLocal()
     
     # Check DB
     record = db.query(UploadModel).filter(
@@ -34,12 +31,7 @@ def debug_file():
     
     # Check R2
     print(f"\nAttempting to fetch from R2 using key: '{record.storage_path}'")
-    s3 = boto3.client(
-        service_name='s3',
-        endpoint_url=settings.R2_ENDPOINT_URL,
-        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-    )
+    s3 = get_r2_client()
     
     try:
         s3.head_object(Bucket=settings.R2_BUCKET_NAME, Key=record.storage_path)
@@ -47,15 +39,17 @@ def debug_file():
     except Exception as e:
         print(f"FAILURE: R2 Error: {e}")
         
-        # List bucket to see what's actually there
-        print("\nListing first 10 items in bucket:")
+        # List the record's own folder (e.g. "1/iri/") to see what's actually there
+        # - scoped by prefix rather than sampling the start of the whole bucket
+        folder = record.storage_path.rsplit('/', 1)[0] + '/' if '/' in record.storage_path else ''
+        print(f"\nListing first 10 items under '{folder}':")
         try:
-             response = s3.list_objects_v2(Bucket=settings.R2_BUCKET_NAME, MaxKeys=10)
+             response = s3.list_objects_v2(Bucket=settings.R2_BUCKET_NAME, Prefix=folder, MaxKeys=10)
              if 'Contents' in response:
                  for obj in response['Contents']:
                      print(f" - {obj['Key']}")
              else:
-                 print("Bucket is empty.")
+                 print("Folder is empty.")
         except Exception as le:
             print(f"List error: {le}")
 
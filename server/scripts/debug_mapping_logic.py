@@ -1,28 +1,30 @@
 
 import sys
 import os
-import boto3
-import pandas as pd
-from io import BytesIO
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import settings
+from core.r2 import get_r2_client
+from _s3util import read_csv_column
+from core.database import SessionLocal
 from models.upload import UploadModel
 
 def debug_mapping():
     print("--- Debugging CSV <-> DB Mapping ---")
     
-    engine = create_engine(settings.DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    db = Session()
+    db = SessionLocal()
     
-    # 1. Find the latest Pothole CSV
-    csv_record = db.query(UploadModel).filter(
-        UploadModel.category == 'pothole',
-        UploadModel.file_type == 'csv'
-    ).order_by(UploadModel.upload_date.desc()).first()
+    # 1. Find the latest Pothole CSV (only the columns we print/use - no ORM instance)
+    csv_record = db.execute(
+        select(
+            UploadModel.filename, UploadModel.original_filename,
+            UploadModel.storage_path, UploadModel.user_id
+        ).where(
+            UploadModel.category == 'pothole',
+            UploadModel.file_type == 'csv'
+        ).order_by(UploadModel.upload_date.desc()).limit(1)
+    ).first()
     
     if not csv_record:
         print("No Pothole CSV found.")
@@ -32,26 +34,21 @@ def debug_mapping():
     
     # 2. Read content
     print(f"Reading from R2: {csv_record.storage_path}")
-    s3 = boto3.client(
-        service_name='s3',
-        endpoint_url=settings.R2_ENDPOINT_URL,
-        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-    )
+    s3 = get_r2_client()
     
     try:
-        obj = s3.get_object(Bucket=settings.R2_BUCKET_NAME, Key=csv_record.storage_path)
-        df = pd.read_csv(BytesIO(obj['Body'].read()))
+        # Parse only the column we need, straight from the stream, with Arrow
+        image_col = read_csv_column(s3, settings.R2_BUCKET_NAME, csv_record.storage_path, 'image_path')
     except Exception as e:
         print(f"Failed to read CSV from R2: {e}")
         return
 
     # 3. Get images from CSV
-    if 'image_path' not in df.columns:
+    if image_col is None:
         print("Column 'image_path' missing in CSV.")
         return
         
-    csv_images = df['image_path'].dropna().unique().tolist()
+    csv_images = image_col.drop_null().unique().to_pylist()
     print(f"Found {len(csv_images)} unique images in CSV.")
     print(f"Sample CSV images: {csv_images[:3]}")
     
@@ -60,35 +57,40 @@ def debug_mapping():
     print(f"Querying DB for images (User ID: {user_id}, Category: pothole)...")
     
     # Check what file types are actually in DB
-    all_pothole_images = db.query(UploadModel).filter(
-        UploadModel.user_id == user_id,
-        UploadModel.category == 'pothole',
-        UploadModel.file_type != 'csv'
-    ).all()
+    # Only original_filename is used below - fetch that single column as plain strings
+    all_pothole_names = db.execute(
+        select(UploadModel.original_filename).where(
+            UploadModel.user_id == user_id,
+            UploadModel.category == 'pothole',
+            UploadModel.file_type != 'csv'
+        )
+    ).scalars().all()
     
-    print(f"Total pothole images in DB: {len(all_pothole_images)}")
-    if all_pothole_images:
-        print(f"Sample DB original_filenames: {[img.original_filename for img in all_pothole_images[:3]]}")
+    print(f"Total pothole images in DB: {len(all_pothole_names)}")
+    if all_pothole_names:
+        print(f"Sample DB original_filenames: {all_pothole_names[:3]}")
     
     # 5. Check intersection
-    matches = db.query(UploadModel).filter(
-        UploadModel.user_id == user_id,
-        UploadModel.category == 'pothole',
-        UploadModel.original_filename.in_(csv_images)
-    ).all()
+    # Both sides are already in memory - intersect them as sets instead of re-querying
+    db_names = set(all_pothole_names)
+    matches = db_names.intersection(csv_images)
+    missing = [name for name in csv_images if name not in db_names]
     
     print(f"MATCHES FOUND: {len(matches)}")
+    print(f"CSV images missing from DB: {len(missing)}")
+    if missing:
+        print(f"Sample missing: {missing[:3]}")
     
-    if len(matches) == 0 and len(csv_images) > 0 and len(all_pothole_images) > 0:
+    if len(matches) == 0 and len(csv_images) > 0 and len(all_pothole_names) > 0:
         print("\n--- MISMATCH ANALYSIS ---")
         csv_first = csv_images[0]
         print(f"CSV Header: '{csv_first}' (Type: {type(csv_first)})")
         
         # Find potential candidate
-        candidate = next((img for img in all_pothole_images if img.original_filename.strip() == csv_first.strip()), None)
+        candidate = next((name for name in all_pothole_names if name.strip() == csv_first.strip()), None)
         if candidate:
             print(f"Found candidate match but equality failed!")
-            print(f"DB: '{candidate.original_filename}'")
+            print(f"DB: '{candidate}'")
             print(f"CSV: '{csv_first}'")
         else:
             print("No close match found for first item.")
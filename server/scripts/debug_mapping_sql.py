@@ -1,19 +1,17 @@
 
 import sys
 import os
-import boto3
-import pandas as pd
-from io import BytesIO
-from sqlalchemy import create_engine
 from sqlalchemy import text # Use direct SQL to avoid ORM circular import issues
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import settings
+from core.r2 import get_r2_client
+from _s3util import read_csv_unique
+from core.database import engine
 
 def debug_mapping_raw_sql():
     print("--- Debugging Logic (Direct SQL) ---")
     
-    engine = create_engine(settings.DATABASE_URL)
     connection = engine.connect()
     
     try:
@@ -36,27 +34,20 @@ def debug_mapping_raw_sql():
         
         # 2. Read content from R2
         print(f"Reading from R2: {storage_path}")
-        s3 = boto3.client(
-            service_name='s3',
-            endpoint_url=settings.R2_ENDPOINT_URL,
-            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-        )
+        s3 = get_r2_client()
         
         try:
-            obj = s3.get_object(Bucket=settings.R2_BUCKET_NAME, Key=storage_path)
-            content = obj['Body'].read()
-            df = pd.read_csv(BytesIO(content))
+            # One string column from the stream - the stdlib csv reader is enough here
+            csv_images = read_csv_unique(s3, settings.R2_BUCKET_NAME, storage_path, 'image_path')
         except Exception as e:
             print(f"Failed to read CSV from R2: {e}")
             return
 
         # 3. Get images from CSV
-        if 'image_path' not in df.columns:
+        if csv_images is None:
             print("Column 'image_path' missing in CSV.")
             return
             
-        csv_images = df['image_path'].dropna().unique().tolist()
         print(f"Found {len(csv_images)} unique images in CSV.")
         if not csv_images:
             return
@@ -4,18 +4,21 @@ import os
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from core.database import SessionLocal
 from models.user import UserModel
 
 def list_users():
     db = SessionLocal()
     try:
-        users = db.query(UserModel).all()
+        # Plain rows of the printed columns - no ORM instances or identity map
+        users = db.execute(
+            select(UserModel.id, UserModel.email, UserModel.role, UserModel.is_active).order_by(UserModel.id)
+        ).all()
         if not users:
             print("No users found in database.")
         for user in users:
-            print(f"ID: {user.id}, Email: {user.email}, Admin: {user.is_superuser}, Active: {user.is_active}")
+            print(f"ID: {user.id}, Email: {user.email}, Admin: {user.role == 'superuser'}, Active: {user.is_active}")
     except Exception as e:
         print(f"Error: {e}")
     finally:
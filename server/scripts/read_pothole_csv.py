@@ -1,29 +1,23 @@
 
 import sys
 import os
-import boto3
-import pandas as pd
-from io import BytesIO
 
 # Add parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import settings
+from core.r2 import get_r2_client
+from _s3util import read_csv_head
 
 # This is the key we saw in the user's log
 CSV_KEY = "1/pothole/846fa3cf-db56-4270-ba76-84623dfa4582.csv"
 
 def check_csv():
     print(f"Downloading {CSV_KEY}...")
-    s3 = boto3.client(
-        service_name='s3',
-        endpoint_url=settings.R2_ENDPOINT_URL,
-        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-    )
+    s3 = get_r2_client()
     
     try:
-        obj = s3.get_object(Bucket=settings.R2_BUCKET_NAME, Key=CSV_KEY)
-        df = pd.read_csv(BytesIO(obj['Body'].read()))
+        # Only the header and first rows are shown - fetch just the start of the file
+        df = read_csv_head(s3, settings.R2_BUCKET_NAME, CSV_KEY)
         
         print("CSV Columns:", df.columns.tolist())
         if 'image_path' in df.columns:
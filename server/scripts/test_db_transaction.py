@@ -2,19 +2,17 @@
 import sys
 import os
 import uuid
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.config import settings
+from core.database import SessionLocal
 from models.upload import UploadModel
 
 def test_transaction():
     print("--- Testing Database Deletion Transaction ---")
     
-    engine = create_engine(settings.DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    db = Session()
+    # Attributes stay loaded after commit, so reading new_upload.id afterwards
+    # doesn't trigger a reload SELECT (the verification queries below are explicit)
+    db = SessionLocal(expire_on_commit=False)
     
     # 1. Create a dummy "Zombie" record
     test_filename = f"zombie_test_{uuid.uuid4().hex[:8]}.jpg"
@@ -28,13 +26,12 @@ def test_transaction():
         category="pothole",
         storage_path=f"1/pothole/{test_filename}",
         file_size=123,
-        file_hash="fakehash"
+        file_hash=f"fakehash_{test_filename}"  # Unique per run - UNIQUE(user_id, file_hash)
     )
     db.add(new_upload)
-    db.commit()
-    db.refresh(new_upload)
-    
+    db.commit()  # INSERT ... RETURNING fills in the id; no refresh SELECT needed
     record_id = new_upload.id
+    
     print(f"   Created ID: {record_id}")
     
     # 2. Verify existence
@@ -54,7 +51,7 @@ def test_transaction():
     # 4. Verify death
     # Create a NEW session to ensure no caching
     db.close()
-    db2 = Session()
+    db2 = SessionLocal()
     
     print("3. Verifying deletion (New Session)...")
     check2 = db2.query(UploadModel).filter(UploadModel.id == record_id).first()
@@ -2,24 +2,23 @@
 import sys
 import os
 import uuid
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.config import settings
+from core.database import engine
+from models.upload import UploadModel
+from _bulkutil import bulk_insert
 
 def test_transaction_sql():
     print("--- Testing Database Deletion (Direct SQL) ---")
     
-    engine = create_engine(settings.DATABASE_URL)
-    connection = engine.connect()
-    
     # 1. Create a dummy "Zombie" record
     test_filename = f"zombie_test_{uuid.uuid4().hex[:8]}.jpg"
     print(f"1. Creating dummy record: {test_filename}")
     
     insert_query = text("""
         INSERT INTO uploads (user_id, filename, original_filename, file_type, category, storage_path, file_size, file_hash, upload_date)
-        VALUES (1, :fname, :orig, 'jpg', 'pothole', :path, 123, 'fakehash', NOW())
+        VALUES (1, :fname, :orig, 'jpg', 'pothole', :path, 123, :fhash, NOW())
         RETURNING id
     """)
     
@@ -28,42 +27,89 @@ def test_transaction_sql():
     delete_query = text("DELETE FROM uploads WHERE id = :id")
     
     try:
-        # Create
-        connection.execute(insert_query, {
-            "fname": test_filename, 
-            "orig": test_filename,
-            "path": f"1/pothole/{test_filename}"
-        })
-        connection.commit()
-        
-        # Get ID
-        record_id = connection.execute(text("SELECT id FROM uploads WHERE filename=:f"), {"f": test_filename}).fetchone()[0]
-        print(f"   Created ID: {record_id}")
-        
-        # Verify
-        if connection.execute(verify_query, {"id": record_id}).fetchone():
-            print("   ✅ Record exists.")
-        
-        # Delete
-        print("2. Deleting record...")
-        connection.execute(delete_query, {"id": record_id})
-        connection.commit()
+        # Create / verify / delete in ONE transaction - a single COMMIT (one WAL flush)
+        # instead of a commit per step
+        with engine.begin() as connection:
+            # RETURNING hands back the new id - no follow-up SELECT by filename
+            record_id = connection.execute(insert_query, {
+                "fname": test_filename, 
+                "orig": test_filename,
+                "path": f"1/pothole/{test_filename}",
+                "fhash": f"fakehash_{test_filename}"  # Unique per run - UNIQUE(user_id, file_hash)
+            }).scalar_one()
+            print(f"   Created ID: {record_id}")
+            
+            # Verify
+            if connection.execute(verify_query, {"id": record_id}).fetchone():
+                print("   ✅ Record exists.")
+            
+            # Delete
+            print("2. Deleting record...")
+            connection.execute(delete_query, {"id": record_id})
         print("   Commit executed.")
         
     except Exception as e:
         print(f"   Error: {e}")
         return
     
-    # 4. Verify death
+    # 4. Verify death - from a separate connection, so only committed state is visible
     print("3. Verifying deletion...")
-    check2 = connection.execute(verify_query, {"id": record_id}).fetchone()
+    with engine.connect() as connection:
+        check2 = connection.execute(verify_query, {"id": record_id}).fetchone()
     
     if check2:
         print("   ❌ ZOMBIE DETECTED! Record still exists.")
     else:
         print("   ✅ Record successfully deleted.")
+
+def test_bulk_transaction_sql(count: int):
+    print(f"--- Testing Bulk Insert + Deletion of {count} records (Direct SQL) ---")
+    
+    # 1. Create the dummy "Zombie" records in batched multi-row INSERTs
+    batch_tag = f"zombie_test_{uuid.uuid4().hex[:8]}"
+    rows = [
+        {
+            "user_id": 1,
+            "filename": f"{batch_tag}_{i}.jpg",
+            "original_filename": f"{batch_tag}_{i}.jpg",
+            "file_type": "jpg",
+            "category": "pothole",
+            "storage_path": f"1/pothole/{batch_tag}_{i}.jpg",
+            "file_size": 123,
+            "file_hash": f"fakehash_{batch_tag}_{i}",
+        }
+        for i in range(count)
+    ]
+    count_query = text("SELECT COUNT(*) FROM uploads WHERE filename LIKE :pattern")
+    delete_query = text("DELETE FROM uploads WHERE filename LIKE :pattern")
+    pattern = {"pattern": f"{batch_tag}_%"}
+    
+    try:
+        with engine.begin() as connection:
+            inserted = bulk_insert(connection, UploadModel.__table__, rows)
+            print(f"1. Inserted {inserted} records ({batch_tag}_*)")
+            print(f"   Visible in transaction: {connection.execute(count_query, pattern).scalar_one()}")
+            
+            print("2. Deleting records...")
+            connection.execute(delete_query, pattern)
+        print("   Commit executed.")
         
-    connection.close()
+    except Exception as e:
+        print(f"   Error: {e}")
+        return
+    
+    print("3. Verifying deletion...")
+    with engine.connect() as connection:
+        remaining = connection.execute(count_query, pattern).scalar_one()
+    
+    if remaining:
+        print(f"   ❌ ZOMBIES DETECTED! {remaining} records still exist.")
+    else:
+        print("   ✅ Records successfully deleted.")
 
 if __name__ == "__main__":
-    test_transaction_sql()
+    # Usage: python test_db_transaction_sql.py [--bulk N]
+    if len(sys.argv) > 2 and sys.argv[1] == "--bulk":
+        test_bulk_transaction_sql(int(sys.argv[2]))
+    else:
+        test_transaction_sql()
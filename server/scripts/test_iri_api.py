@@ -44,19 +44,19 @@ def test_iri_computation():
     # 3. Verify Response Structure
     print(f"Total Segments: {result.get('total_segments')}")
     
-    # Check Chart Data
+    # Check Chart Data (columnar: one array per series, all sharing the 'time' axis)
     raw_data = result.get('raw_data')
     filtered_data = result.get('filtered_data')
     
-    if raw_data and len(raw_data) > 0:
-        print(f"✅ Raw Data present: {len(raw_data)} points")
-        print(f"   Sample: {raw_data[0]}")
+    if raw_data and raw_data.get('time'):
+        print(f"✅ Raw Data present: {len(raw_data['time'])} points")
+        print(f"   Sample: { {name: values[0] for name, values in raw_data.items()} }")
     else:
         print("❌ Raw Data MISSING or empty")
         
-    if filtered_data and len(filtered_data) > 0:
-        print(f"✅ Filtered Data present: {len(filtered_data)} points")
-        print(f"   Sample: {filtered_data[0]}")
+    if filtered_data and filtered_data.get('time'):
+        print(f"✅ Filtered Data present: {len(filtered_data['time'])} points")
+        print(f"   Sample: { {name: values[0] for name, values in filtered_data.items()} }")
     else:
         print("❌ Filtered Data MISSING or empty")
 
@@ -1,24 +1,27 @@
 
 import sys
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.config import settings
+from sqlalchemy import select, func
+from core.database import SessionLocal
 from models.upload import UploadModel
 from models.user import UserModel # Import to ensure relationships are set
 
 def verify():
-    engine = create_engine(settings.DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    db = Session()
+    db = SessionLocal()
     
-    count = db.query(UploadModel).count()
+    # Plain SELECT COUNT(*) rather than Query.count()'s COUNT over a subquery
+    count = db.execute(select(func.count()).select_from(UploadModel)).scalar()
     print(f"Total Uploads in DB: {count}")
     
     if count > 0:
-        last = db.query(UploadModel).order_by(UploadModel.id.desc()).first()
+        last = db.execute(
+            select(
+                UploadModel.filename, UploadModel.storage_path,
+                UploadModel.file_hash, UploadModel.file_size
+            ).order_by(UploadModel.id.desc()).limit(1)
+        ).first()
         print(f"Last Upload: {last.filename}")
         print(f"Storage Path: {last.storage_path}")
         print(f"File Hash: {last.file_hash}")
@@ -1,13 +1,18 @@
 
 import sys
 import os
-import boto3
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import settings
+from core.r2 import get_r2_client
+from _s3util import delete_prefix, set_expiry_rule, remove_expiry_rule
+from core.database import engine
 
-def wipe_potholes():
+# Lifecycle rule used by --lifecycle (remove it with --remove-lifecycle afterwards)
+LIFECYCLE_RULE_ID = "wipe-pothole"
+
+def wipe_potholes(use_lifecycle=False):
     print("WARNING: This will delete ALL Pothole data (DB Records + R2 Images).")
     confirm = input("Type 'destroy' to proceed: ")
     if confirm != "destroy":
@@ -16,13 +21,7 @@ def wipe_potholes():
 
     # 1. Clear R2
     print("\n1. Cleaning R2 Bucket (1/pothole/)...")
-    s3 = boto3.resource(
-        service_name='s3',
-        endpoint_url=settings.R2_ENDPOINT_URL,
-        aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-    )
-    bucket = s3.Bucket(settings.R2_BUCKET_NAME)
+    s3 = get_r2_client()
     
     # Delete objects with prefix "1/pothole/" (Assuming User ID 1)
     # Ideally should query users but we know context is Jacob (User 1)
@@ -30,35 +29,55 @@ def wipe_potholes():
     # Let's stick to "1/pothole/" based on debug logs
     prefix = "1/pothole/" 
     try:
-        bucket.objects.filter(Prefix=prefix).delete()
-        print("   R2 Pothole images deleted.")
+        if use_lifecycle:
+            # Server-side expiry: no listing/deleting from here, however many objects there are
+            set_expiry_rule(s3, settings.R2_BUCKET_NAME, LIFECYCLE_RULE_ID, prefix, days=1)
+            print(f"   Lifecycle rule '{LIFECYCLE_RULE_ID}' installed - objects under {prefix} will be purged within ~24h.")
+            print("   NOTE: it also expires NEW uploads under that prefix. Run with --remove-lifecycle")
+            print("   once the purge is done, before re-uploading.")
+        else:
+            deleted = delete_prefix(s3, settings.R2_BUCKET_NAME, prefix)
+            print(f"   R2 Pothole images deleted ({deleted} objects).")
     except Exception as e:
         print(f"   Error clearing R2: {e}")
 
     # 2. Clear Database
     print("\n2. Cleaning Database (uploads table)...")
-    engine = create_engine(settings.DATABASE_URL)
-    with engine.connect() as conn:
-        # Delete related pothole_images first if they exist (though cascade might handle it)
-        # But our manual logic uses uploads table.
-        # Smart Deletion logic uses UploadModel.
-        try:
-             # Delete child records from pothole_images first to avoid FK constraint errors
-             print("   Deleting from pothole_images...")
-             conn.execute(text("DELETE FROM pothole_images"))
-             
-             # Delete from uploads where category='pothole'
-             print("   Deleting from uploads...")
-             result = conn.execute(text("DELETE FROM uploads WHERE category = 'pothole'"))
-             print(f"   Deleted {result.rowcount} records from DB.")
-             conn.commit()
-        except Exception as e:
-            print(f"   Error clearing DB: {e}")
+    try:
+        # One transaction - either everything pothole-related goes or nothing does
+        with engine.begin() as conn:
+            only_potholes = conn.dialect.name == "postgresql" and not conn.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM uploads WHERE category <> 'pothole')"
+            )).scalar()
+            if only_potholes:
+                # Nothing else lives in uploads: TRUNCATE frees the tables in O(1)
+                # instead of a per-row MVCC delete
+                print("   uploads holds only pothole data - truncating...")
+                conn.execute(text("TRUNCATE pothole_images, uploads RESTART IDENTITY"))
+                print("   Truncated pothole_images and uploads.")
+            else:
+                # Children first: the ON DELETE CASCADE FK only exists once
+                # scripts/add_pothole_images_fk_cascade.py has run (and SQLite doesn't enforce it)
+                print("   Deleting from pothole_images...")
+                conn.execute(text("DELETE FROM pothole_images"))
+                print("   Deleting from uploads...")
+                result = conn.execute(text("DELETE FROM uploads WHERE category = 'pothole'"))
+                print(f"   Deleted {result.rowcount} records from DB.")
+    except Exception as e:
+        print(f"   Error clearing DB: {e}")
 
-    print("\nDone. System is clean. Please re-upload CSV + IMAGES together.")
+    if use_lifecycle:
+        print("\nDone. DB is clean; R2 images expire within ~24h. Remove the rule (--remove-lifecycle) before re-uploading.")
+    else:
+        print("\nDone. System is clean. Please re-upload CSV + IMAGES together.")
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "--force":
+    # Usage: python wipe_potholes.py [--force] [--lifecycle] | --remove-lifecycle
+    use_lifecycle = "--lifecycle" in sys.argv
+    if "--remove-lifecycle" in sys.argv:
+        removed = remove_expiry_rule(get_r2_client(), settings.R2_BUCKET_NAME, LIFECYCLE_RULE_ID)
+        print(f"Lifecycle rule '{LIFECYCLE_RULE_ID}' {'removed' if removed else 'was not installed'}.")
+    elif "--force" in sys.argv:
         print("Force mode enabled.")
         class ForceInput:
             def __call__(self, prompt):
@@ -67,6 +86,6 @@ if __name__ == "__main__":
         # Alternatively just bypass the check in a refactored main, but mocking input is quick hack or just change logic
         # Let's change logic slightly
         print("WARNING: This will delete ALL Pothole data (DB Records + R2 Images).")
-        wipe_potholes()
+        wipe_potholes(use_lifecycle)
     else:
-        wipe_potholes()
+        wipe_potholes(use_lifecycle)
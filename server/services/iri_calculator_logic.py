@@ -210,7 +210,9 @@ class IRICalculator:
 
     # Finally, calculation of IRI by RMS method
     # Possible points of improvement: Have a user input how many meters is in a segment
-    def calculate_iri_rms_method(self, df, segment_length=100):     # create IRI values for every 100m
+    # return_vertical_accel=True also returns the filtered vertical acceleration, so callers that
+    # plot it don't have to run the Butterworth filter over the whole signal a second time
+    def calculate_iri_rms_method(self, df, segment_length=100, return_vertical_accel=False):     # create IRI values for every 100m
 
         # Filtered data
         df_filtered, sampling_rate = self.filter_accelerometer_data(df)
@@ -244,6 +246,8 @@ class IRICalculator:
             iri, speed = self._calculate_segment_iri(segment)
             iri_values.append(iri)
 
+        if return_vertical_accel:
+            return iri_values, segments, sampling_rate, speed, vertical_accel
         return iri_values, segments, sampling_rate, speed
 
     #Create Segments of specified length
@@ -279,8 +283,8 @@ class IRICalculator:
         vertical_accel = segment['vertical_accel']
         mean_speed = np.mean(segment['speed'])
 
-        # Calculate RMS acceleration
-        rms_accel = np.sqrt(np.mean(vertical_accel**2))
+        # Calculate RMS acceleration (dot product: no temporary squared array)
+        rms_accel = np.sqrt(np.dot(vertical_accel, vertical_accel) / vertical_accel.size)
 
         # Convert to IRI with empirical relationship
         # IRI = K * (RMS_accel)^n / speed^m
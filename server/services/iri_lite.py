@@ -6,12 +6,25 @@ Processes IRI data in chunks and returns only map-essential data.
 import pandas as pd
 import numpy as np
 from scipy import signal
-from scipy.integrate import cumulative_trapezoid
 import gc
 import logging
+import os
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Parse sensor columns straight to their final dtype in the C reader.
+# float32 is plenty for accelerometer/speed readings and halves their memory;
+# coordinates keep float64 (float32 would lose ~1 m of position).
+NUMERIC_DTYPES = {
+    'ax': 'float32', 'ay': 'float32', 'az': 'float32', 'speed': 'float32',
+    'latitude': 'float64', 'longitude': 'float64',
+}
+
+# From this size up, parse with Arrow's multithreaded CSV reader instead of the
+# single-threaded C parser (below it, thread start-up isn't worth it)
+PARALLEL_CSV_BYTES = 8 * 1024 * 1024
+
 
 def get_iri_color(iri_value: float) -> str:
     """Get color for IRI value (for map rendering)."""
@@ -25,6 +38,62 @@ def get_iri_color(iri_value: float) -> str:
         return '#dc2626'  # Red - Bad
 
 
+@lru_cache(maxsize=32)
+def _lowpass_sos(order: int, cutoff_hz: float, fs: float) -> np.ndarray:
+    """
+    Butterworth low-pass as second-order sections, cached per (order, cutoff, fs).
+    Callers round fs so recordings from the same device share one entry; the
+    cutoff is clamped below Nyquist. The array is shared - don't modify it.
+    Designed in float64, stored as float32 (the dtype of the signal it filters).
+    """
+    nyquist = fs / 2
+    if cutoff_hz >= nyquist:
+        cutoff_hz = nyquist * 0.9
+    return signal.butter(order, cutoff_hz / nyquist, btype='low', output='sos').astype(np.float32)
+
+
+def _cumulative_distance(speed: np.ndarray, time: np.ndarray) -> np.ndarray:
+    """
+    Cumulative trapezoidal integral of speed over time (initial 0), i.e.
+    cumulative_trapezoid(speed, time, initial=0), written into one output array
+    with in-place ufuncs instead of scipy's chain of temporaries.
+    """
+    out = np.empty(len(speed), dtype=np.float64)
+    out[0] = 0.0
+    steps = out[1:]
+    np.add(speed[1:], speed[:-1], out=steps)
+    steps *= np.diff(time)
+    steps *= 0.5
+    np.cumsum(steps, out=steps)
+    return out
+
+
+def _nearest_indices(sorted_values: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Index of the element closest to each target in a non-decreasing array,
+    i.e. np.argmin(np.abs(sorted_values - t)) for every t (ties -> first index),
+    via binary search instead of a full sweep per target.
+    """
+    idx = np.searchsorted(sorted_values, targets, side='left')
+    idx = np.clip(idx, 1, len(sorted_values) - 1)
+    left, right = sorted_values[idx - 1], sorted_values[idx]
+    idx = idx - ((targets - left) <= (right - targets))
+    # Runs of equal values (zero speed): argmin returns the first of the run
+    return np.searchsorted(sorted_values, sorted_values[idx], side='left')
+
+
+def _segment_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Sum of values[start:end] for every (start, end) pair, in one reduceat pass.
+    Pairs are interleaved, so every other result is a segment sum (requires end > start).
+    Accumulates in float64 even for float32 input.
+    """
+    if len(starts) == 0:
+        return np.empty(0)
+    bounds = np.column_stack((starts, ends)).ravel()
+    return np.add.reduceat(values, bounds, dtype=np.float64)[::2]
+
+
 def process_iri_chunked(file_obj, segment_length: int = 100, chunk_size: int = 10000):
     """
     Process IRI data in chunks to minimize memory usage.
@@ -41,14 +110,17 @@ def process_iri_chunked(file_obj, segment_length: int = 100, chunk_size: int = 1
     logger.info("Starting chunked IRI processing...")
     
     try:
-        # Read CSV in chunks for large files
-        # First, get total row count and column info
-        df_peek = pd.read_csv(file_obj, nrows=5)
-        file_obj.seek(0)  # Reset to beginning
+        # Paths are reopened by each read; file objects have to be rewound between reads
+        is_path = isinstance(file_obj, (str, os.PathLike))
+        
+        # Header only - just to learn which columns exist (no rows are parsed)
+        columns = set(pd.read_csv(file_obj, nrows=0).columns)
+        if not is_path:
+            file_obj.seek(0)  # Reset to beginning
         
         # Check required columns
         required_cols = ['time', 'ax', 'ay', 'az']
-        missing_cols = [col for col in required_cols if col not in df_peek.columns]
+        missing_cols = [col for col in required_cols if col not in columns]
         if missing_cols:
             return {
                 'success': False,
@@ -56,7 +128,7 @@ def process_iri_chunked(file_obj, segment_length: int = 100, chunk_size: int = 1
                 'segments': []
             }
         
-        has_gps = all(col in df_peek.columns for col in ['latitude', 'longitude', 'speed'])
+        has_gps = all(col in columns for col in ['latitude', 'longitude', 'speed'])
         
         # For IRI calculation, we need the whole file but process segments one by one
         # Load with only essential columns
@@ -64,25 +136,46 @@ def process_iri_chunked(file_obj, segment_length: int = 100, chunk_size: int = 1
         if has_gps:
             usecols.extend(['latitude', 'longitude', 'speed'])
         
-        logger.info(f"Loading CSV with columns: {usecols}")
-        df = pd.read_csv(file_obj, usecols=usecols)
+        if is_path:
+            file_size = os.path.getsize(file_obj)
+        else:
+            file_obj.seek(0, os.SEEK_END)
+            file_size = file_obj.tell()
+            file_obj.seek(0)
+        
+        dtypes = {col: NUMERIC_DTYPES[col] for col in usecols if col in NUMERIC_DTYPES}
+        if file_size >= PARALLEL_CSV_BYTES:
+            engine = 'pyarrow'
+            # Keep time as text: Arrow would otherwise infer a timestamp unit of its own
+            dtypes['time'] = 'str'
+        else:
+            engine = 'c'
+        
+        logger.info(f"Loading CSV with columns: {usecols} ({engine} parser)")
+        try:
+            df = pd.read_csv(file_obj, usecols=usecols, engine=engine, dtype=dtypes)
+        except ValueError:
+            # Non-numeric junk in a sensor column - read untyped and coerce it to NaN below
+            if not is_path:
+                file_obj.seek(0)
+            df = pd.read_csv(file_obj, usecols=usecols)
         logger.info(f"Loaded {len(df)} rows")
         
         # Preprocess time
         df['time'] = pd.to_datetime(df['time']).astype('int64') / 1e9
         df['time'] = df['time'] - df['time'].iloc[0]
         
-        # Convert columns to numeric
-        for col in ['ax', 'ay', 'az']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        if has_gps:
-            for col in ['latitude', 'longitude', 'speed']:
+        # Convert columns to numeric (only needed when the typed read fell back)
+        for col in usecols[1:]:
+            if not pd.api.types.is_numeric_dtype(df[col]):
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
         # Drop NaN rows
-        df = df.dropna(subset=['time', 'ax', 'ay', 'az'])
-        df = df.sort_values('time').reset_index(drop=True)
+        df = df.dropna(subset=['time', 'ax', 'ay', 'az'], ignore_index=True)
+        # Sensor logs are almost always written in time order - only pay for a
+        # sort (and the full copy it makes) when they aren't
+        if not df['time'].is_monotonic_increasing:
+            df = df.sort_values('time', kind='stable', ignore_index=True)
         
         if len(df) < 100:
             return {
@@ -97,73 +190,79 @@ def process_iri_chunked(file_obj, segment_length: int = 100, chunk_size: int = 1
         logger.info(f"Sampling rate: {sampling_rate:.2f} Hz")
         
         # Filter accelerometer data (use az as vertical)
-        cutoff_freq = 10
-        nyquist = sampling_rate / 2
-        if cutoff_freq >= nyquist:
-            cutoff_freq = nyquist * 0.9
-        
-        b, a = signal.butter(4, cutoff_freq / nyquist, btype='low')
-        az_filtered = signal.filtfilt(b, a, df['az'].values)
+        # Second-order sections: scipy runs the forward and backward biquad cascades
+        # in compiled code and, unlike (b, a) form, stays stable at low cutoff ratios
+        sos = _lowpass_sos(4, 10.0, round(float(sampling_rate), 1))
+        # float32 for the accelerometer arrays: half the memory traffic, and ample
+        # precision for a 2-decimal IRI (time/distance stay float64). sosfiltfilt's
+        # initial state is float64, so its output is narrowed back explicitly.
+        az_filtered = signal.sosfiltfilt(sos, df['az'].to_numpy(dtype=np.float32)).astype(np.float32, copy=False)
         
-        # Remove gravity component
-        vertical_accel = az_filtered - np.mean(az_filtered)
+        # Remove gravity component (in place - no second signal-sized array)
+        az_filtered -= np.mean(az_filtered, dtype=np.float64).astype(np.float32)
+        vertical_accel = az_filtered
         
         # Get speed
         if has_gps and 'speed' in df.columns:
-            speed = df['speed'].values
+            speed = df['speed'].to_numpy(dtype=np.float64)
         else:
             speed = np.full(len(df), 15.0)  # Default 15 m/s
         
         # Calculate distance
         time_array = df['time'].values
-        distance = cumulative_trapezoid(speed, time_array, initial=0)
+        distance = _cumulative_distance(speed, time_array)
         
         # Process segments
-        segments = []
         max_distance = distance[-1]
         
         logger.info(f"Total distance: {max_distance:.2f}m, creating segments of {segment_length}m")
         
-        for start_dist in np.arange(0, max_distance - segment_length, segment_length):
-            end_dist = start_dist + segment_length
-            
-            # Find indices
-            start_idx = np.argmin(np.abs(distance - start_dist))
-            end_idx = np.argmin(np.abs(distance - end_dist))
-            
-            if end_idx <= start_idx:
-                continue
-            
-            # Calculate IRI for segment
-            segment_accel = vertical_accel[start_idx:end_idx]
-            segment_speed = speed[start_idx:end_idx]
-            
-            rms_accel = np.sqrt(np.mean(segment_accel ** 2))
-            mean_speed = np.mean(segment_speed)
-            
-            # IRI formula: K * RMS_accel / speed
-            K = 80.59
-            iri_value = (K * rms_accel / mean_speed) if mean_speed > 0 else 0
-            
-            # Get GPS coordinates
-            start_lat, start_lon, end_lat, end_lon = None, None, None, None
-            if has_gps:
-                start_lat = float(df.iloc[start_idx]['latitude'])
-                start_lon = float(df.iloc[start_idx]['longitude'])
-                end_lat = float(df.iloc[end_idx - 1]['latitude'])
-                end_lon = float(df.iloc[end_idx - 1]['longitude'])
-            
-            segments.append({
-                'start_lat': start_lat,
-                'start_lon': start_lon,
-                'end_lat': end_lat,
-                'end_lon': end_lon,
+        # Segment boundaries for every segment at once (see _nearest_indices)
+        start_dists = np.arange(0, max_distance - segment_length, segment_length)
+        end_dists = start_dists + segment_length
+        start_idx = _nearest_indices(distance, start_dists)
+        end_idx = _nearest_indices(distance, end_dists)
+        
+        keep = end_idx > start_idx
+        start_dists, end_dists = start_dists[keep], end_dists[keep]
+        start_idx, end_idx = start_idx[keep], end_idx[keep]
+        
+        counts = end_idx - start_idx
+        rms_accel = np.sqrt(_segment_sums(np.square(vertical_accel), start_idx, end_idx) / counts)
+        mean_speed = _segment_sums(speed, start_idx, end_idx) / counts
+        
+        # IRI formula: K * RMS_accel / speed
+        K = 80.59
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iri_values = np.where(mean_speed > 0, K * rms_accel / mean_speed, 0.0)
+        
+        # Get GPS coordinates
+        if has_gps:
+            lat = df['latitude'].to_numpy(dtype=np.float64)
+            lon = df['longitude'].to_numpy(dtype=np.float64)
+            start_lats, start_lons = lat[start_idx].tolist(), lon[start_idx].tolist()
+            end_lats, end_lons = lat[end_idx - 1].tolist(), lon[end_idx - 1].tolist()
+        else:
+            start_lats = start_lons = end_lats = end_lons = [None] * len(start_idx)
+        
+        segments = [
+            {
+                'start_lat': s_lat,
+                'start_lon': s_lon,
+                'end_lat': e_lat,
+                'end_lon': e_lon,
                 'iri_value': round(iri_value, 2),
                 'color': get_iri_color(iri_value),
-                'mean_speed': round(mean_speed, 2),
-                'distance_start': round(start_dist, 1),
-                'distance_end': round(end_dist, 1)
-            })
+                'mean_speed': round(spd, 2),
+                'distance_start': round(d_start, 1),
+                'distance_end': round(d_end, 1)
+            }
+            for s_lat, s_lon, e_lat, e_lon, iri_value, spd, d_start, d_end in zip(
+                start_lats, start_lons, end_lats, end_lons,
+                iri_values.tolist(), mean_speed.tolist(),
+                start_dists.tolist(), end_dists.tolist()
+            )
+        ]
         
         # Cleanup
         del df, vertical_accel, speed, distance, az_filtered
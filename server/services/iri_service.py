@@ -1,13 +1,12 @@
 import os
 import sys
 import time
-import pandas as pd
 import numpy as np
 from typing import Tuple, List, Dict, Any
 
 # Import the local IRI calculator
 from services.iri_calculator_logic import IRICalculator
-from models.iri_models import IRISegment, IRIComputationResponse, IRIComputationRequest
+from models.iri_models import IRIComputationResponse, IRIComputationRequest, iri_segments_adapter
 
 class IRIService:
     def __init__(self):
@@ -34,9 +33,11 @@ class IRIService:
                 raise ValueError("Failed to preprocess data")
             
             # Compute IRI values
-            iri_values, segments, sampling_rate, speed = self.calculator.calculate_iri_rms_method(
+            # Also hand back the filtered vertical acceleration used for the chart
+            iri_values, segments, sampling_rate, speed, vertical_accel = self.calculator.calculate_iri_rms_method(
                 processed_df,
-                segment_length=request.segment_length
+                segment_length=request.segment_length,
+                return_vertical_accel=True
             )
             
             # Prepare chart data (downsample if too large)
@@ -44,64 +45,70 @@ class IRIService:
             total_rows = len(processed_df)
             step = max(1, total_rows // 2000)
             
-            raw_data = []
-            filtered_data = []
-            
-            # Get filtered data for plotting
-            df_filtered, _ = self.calculator.filter_accelerometer_data(processed_df)
-            vertical_accel = self.calculator.extract_vertical_acceleration(df_filtered)
-            
-            for i in range(0, total_rows, step):
-                row = processed_df.iloc[i]
-                raw_data.append({
-                    "time": float(row['time']),
-                    "ax": float(row['ax']),
-                    "ay": float(row['ay']),
-                    "az": float(row['az']),
-                    "speed": float(row['speed']) if 'speed' in row else 0.0
-                })
-                
-                filtered_data.append({
-                    "time": float(df_filtered.iloc[i]['time']),
-                    "vertical_accel": float(vertical_accel[i])
-                })
+            # Strided column slices, sent columnar (see IRIComputationResponse.raw_data)
+            sampled = processed_df.iloc[:total_rows:step]
+            raw_data = {
+                "time": sampled['time'].to_numpy(dtype=np.float64).tolist(),
+                "ax": sampled['ax'].to_numpy(dtype=np.float64).tolist(),
+                "ay": sampled['ay'].to_numpy(dtype=np.float64).tolist(),
+                "az": sampled['az'].to_numpy(dtype=np.float64).tolist(),
+                "speed": (
+                    sampled['speed'].to_numpy(dtype=np.float64).tolist()
+                    if 'speed' in sampled.columns else [0.0] * len(sampled)
+                )
+            }
+            
+            filtered_data = {
+                "time": processed_df['time'].to_numpy(dtype=np.float64)[:total_rows:step].tolist(),
+                "vertical_accel": np.asarray(vertical_accel, dtype=np.float64)[:total_rows:step].tolist()
+            }
 
             # Convert segments to response format
-            iri_segments = []
+            # GPS columns as plain arrays - integer indexing, no per-segment .iloc Series
+            n_rows = len(processed_df)
+            has_gps = 'latitude' in processed_df.columns and 'longitude' in processed_df.columns
+            if has_gps:
+                lat = processed_df['latitude'].to_numpy(dtype=np.float64)
+                lon = processed_df['longitude'].to_numpy(dtype=np.float64)
+            
+            segment_rows = []
             for i, (iri_val, segment) in enumerate(zip(iri_values, segments)):
+                seg_accel = segment['vertical_accel']
+                
                 # Extract coordinates if available
                 start_lat, start_lon, end_lat, end_lon = None, None, None, None
                 
                 start_idx = segment.get('start_index')
                 end_idx = segment.get('end_index')
                 
-                if start_idx is not None and end_idx is not None:
+                if has_gps and start_idx is not None and end_idx is not None:
                     # Ensure indices are within bounds
-                    if start_idx < len(processed_df):
-                        if 'latitude' in processed_df.columns and 'longitude' in processed_df.columns:
-                            start_lat = float(processed_df.iloc[start_idx]['latitude'])
-                            start_lon = float(processed_df.iloc[start_idx]['longitude'])
+                    if start_idx < n_rows:
+                        start_lat = float(lat[start_idx])
+                        start_lon = float(lon[start_idx])
                     
                     # For end index, use end_idx - 1 as end_idx is exclusive in slicing but we want the last point
                     actual_end_idx = end_idx - 1
-                    if actual_end_idx < len(processed_df) and actual_end_idx >= 0:
-                        if 'latitude' in processed_df.columns and 'longitude' in processed_df.columns:
-                            end_lat = float(processed_df.iloc[actual_end_idx]['latitude'])
-                            end_lon = float(processed_df.iloc[actual_end_idx]['longitude'])
+                    if actual_end_idx < n_rows and actual_end_idx >= 0:
+                        end_lat = float(lat[actual_end_idx])
+                        end_lon = float(lon[actual_end_idx])
 
-                iri_segments.append(IRISegment(
-                    segment_id=i + 1,
-                    distance_start=float(segment['distance_start']),
-                    distance_end=float(segment['distance_end']),
-                    segment_length=float(segment['length']),
-                    iri_value=float(iri_val),
-                    mean_speed=float(np.mean(segment['speed'])),
-                    rms_accel=float(np.sqrt(np.mean(segment['vertical_accel']**2))),
-                    start_lat=start_lat,
-                    start_lon=start_lon,
-                    end_lat=end_lat,
-                    end_lon=end_lon
-                ))
+                segment_rows.append({
+                    "segment_id": i + 1,
+                    "distance_start": float(segment['distance_start']),
+                    "distance_end": float(segment['distance_end']),
+                    "segment_length": float(segment['length']),
+                    "iri_value": float(iri_val),
+                    "mean_speed": float(np.mean(segment['speed'])),
+                    "rms_accel": float(np.sqrt(np.dot(seg_accel, seg_accel) / seg_accel.size)),
+                    "start_lat": start_lat,
+                    "start_lon": start_lon,
+                    "end_lat": end_lat,
+                    "end_lon": end_lon
+                })
+            
+            # Validate all segments in one pass
+            iri_segments = iri_segments_adapter.validate_python(segment_rows)
             
             processing_time = time.time() - start_time
             
@@ -131,7 +138,6 @@ class IRIService:
             import gc
             if 'df' in locals(): del df
             if 'processed_df' in locals(): del processed_df
-            if 'df_filtered' in locals(): del df_filtered
             if 'vertical_accel' in locals(): del vertical_accel
             gc.collect()
     
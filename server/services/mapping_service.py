@@ -1,8 +1,16 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import os
-from models.mapping_models import VehicleMarker, PotholeMarker, PavementSegment
+from concurrent.futures import ThreadPoolExecutor
+from models.mapping_models import (
+    VehicleMarker, PotholeMarker, PavementSegment,
+    vehicle_markers_adapter, pothole_markers_adapter
+)
+from utils.records import column_records
+
+# Upper bound on concurrent CSV reads when merging several files
+MAX_CSV_READERS = 8
 
 class MappingService:
     
@@ -20,32 +28,40 @@ class MappingService:
         merged_df['vehicle_type'] = merged_df['vehicle_type'].replace('bicycle', 'motorcycle')
         df_filtered = merged_df[merged_df['vehicle_type'].isin(valid_types)].copy()
         
-        markers = []
-        vehicle_counts = df_filtered['vehicle_type'].value_counts()
+        if df_filtered.empty:
+            return [], 0
         
         vehicle_config = {
             'car': {'color': 'blue', 'icon': 'car', 'tooltip': '🚗 Car'},
             'truck': {'color': 'orange', 'icon': 'truck', 'tooltip': '🚛 Truck'},
             'motorcycle': {'color': 'green', 'icon': 'motorcycle', 'tooltip': '🏍️ Motorcycle'}
         }
+        categories = list(vehicle_config)
         
-        for idx, row in df_filtered.iterrows():
-            try:
-                v_type = row['vehicle_type']
-                config = vehicle_config.get(v_type, {'color': 'gray', 'icon': 'question', 'tooltip': '❓ Unknown'})
-                
-                markers.append(VehicleMarker(
-                    lat=float(row['latitude']),
-                    lon=float(row['longitude']),
-                    vehicle_type=v_type,
-                    count=int(vehicle_counts.get(v_type, 0)),
-                    popup_html=f"Type: {v_type.title()}<br>Count: {vehicle_counts.get(v_type, 0)}",
-                    tooltip=config['tooltip'],
-                    color=config['color'],
-                    icon=config['icon']
-                ))
-            except Exception:
-                continue
+        # Integer category code per row (bicycle is already folded into motorcycle)
+        codes = pd.Categorical(df_filtered['vehicle_type'], categories=categories).codes
+        counts_by_cat = np.bincount(codes, minlength=len(categories))
+        
+        # Every field but the coordinates depends only on the type: build each once
+        # per category, then gather by code instead of mapping strings row by row
+        per_category = {
+            'vehicle_type': np.array(categories, dtype=object),
+            'count': counts_by_cat,
+            'popup_html': np.array(
+                [f"Type: {t.title()}<br>Count: {n}" for t, n in zip(categories, counts_by_cat)], dtype=object
+            ),
+            'tooltip': np.array([vehicle_config[t]['tooltip'] for t in categories], dtype=object),
+            'color': np.array([vehicle_config[t]['color'] for t in categories], dtype=object),
+            'icon': np.array([vehicle_config[t]['icon'] for t in categories], dtype=object)
+        }
+        
+        # Build marker fields column-wise, then validate the whole batch in one call
+        rows = column_records({
+            'lat': df_filtered['latitude'].astype(float).to_numpy(),
+            'lon': df_filtered['longitude'].astype(float).to_numpy(),
+            **{field: values[codes] for field, values in per_category.items()}
+        })
+        markers = vehicle_markers_adapter.validate_python(rows)
                 
         return markers, len(markers)
 
@@ -57,26 +73,28 @@ class MappingService:
         if merged_df is None or len(merged_df) == 0:
             return [], 0
             
-        markers = []
         base_url = "https://pub-3acbf94b790d4e7cb2e8bed9bf68f024.r2.dev"
         
-        for idx, row in merged_df.iterrows():
-            try:
-                image_path = row['image_path']
-                image_url = f"{base_url}/{image_path}"
-                confidence = float(row['confidence_score'])
-                
-                markers.append(PotholeMarker(
-                    lat=float(row['latitude']),
-                    lon=float(row['longitude']),
-                    confidence=confidence,
-                    image_path=image_path,
-                    image_url=image_url,
-                    popup_html=f"Pothole<br>Confidence: {confidence:.2%}",
-                    tooltip=f"Pothole ({confidence:.1%})"
-                ))
-            except Exception:
-                continue
+        # Rows without a usable confidence or image path can't become markers
+        merged_df['confidence_score'] = pd.to_numeric(merged_df['confidence_score'], errors='coerce')
+        merged_df = merged_df.dropna(subset=['confidence_score', 'image_path'])
+        if merged_df.empty:
+            return [], 0
+        
+        image_paths = merged_df['image_path'].astype(str)
+        confidence = merged_df['confidence_score'].astype(float)
+        
+        # Build marker fields column-wise, then validate the whole batch in one call
+        rows = column_records({
+            'lat': merged_df['latitude'].astype(float).to_numpy(),
+            'lon': merged_df['longitude'].astype(float).to_numpy(),
+            'confidence': confidence.to_numpy(),
+            'image_path': image_paths.to_numpy(),
+            'image_url': (base_url + "/" + image_paths).to_numpy(),
+            'popup_html': [f"Pothole<br>Confidence: {c:.2%}" for c in confidence],
+            'tooltip': [f"Pothole ({c:.1%})" for c in confidence]
+        })
+        markers = pothole_markers_adapter.validate_python(rows)
                 
         return markers, len(markers)
 
@@ -99,51 +117,53 @@ class MappingService:
         if len(merged_df) < 2:
             return [], 0
             
-        current_type = None
-        current_points = []
+        # One (N, 2) float32 coordinate block; each segment is a slice of it
+        coords = merged_df[['latitude', 'longitude']].to_numpy(dtype=np.float32)
+        types = merged_df['type']
         
-        for idx, row in merged_df.iterrows():
-            p_type = row['type']
-            point = [float(row['latitude']), float(row['longitude'])]
-            
-            if current_type is not None and p_type != current_type:
-                if len(current_points) >= 2:
-                    segments.append(PavementSegment(
-                        points=current_points.copy(),
-                        type=current_type,
-                        color=color_map.get(current_type, '#808080')
-                    ))
-                current_points = []
-            
-            current_points.append(point)
-            current_type = p_type
-            
-        if len(current_points) >= 2:
+        # Runs of consecutive rows with the same type: [starts[i], ends[i])
+        # - the loop below is per segment, not per row
+        starts = np.flatnonzero(types.ne(types.shift()).to_numpy())
+        ends = np.append(starts[1:], len(merged_df))
+        
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            segment_type = types.iat[start]
             segments.append(PavementSegment(
-                points=current_points,
-                type=current_type,
-                color=color_map.get(current_type, '#808080')
+                points=coords[start:end],
+                type=segment_type,
+                color=color_map.get(segment_type, '#808080')
             ))
             
         return segments, len(segments)
 
+    def _read_csv(self, path: str, required_cols: List[str]) -> Optional[pd.DataFrame]:
+        """One CSV with valid coordinates, or None if it's missing, unreadable or lacks columns."""
+        try:
+            if os.path.exists(path):
+                df = pd.read_csv(path)
+                # Check cols
+                if all(col in df.columns for col in required_cols):
+                    # Validate numeric coords
+                    if 'latitude' in df.columns:
+                        df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+                    if 'longitude' in df.columns:
+                        df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+                    return df.dropna(subset=['latitude', 'longitude'])
+        except Exception:
+            pass
+        return None
+
     def _merge_csvs(self, file_paths: List[str], required_cols: List[str]) -> pd.DataFrame:
-        dfs = []
-        for path in file_paths:
-            try:
-                if os.path.exists(path):
-                    df = pd.read_csv(path)
-                    # Check cols
-                    if all(col in df.columns for col in required_cols):
-                        # Validate numeric coords
-                        if 'latitude' in df.columns:
-                            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-                        if 'longitude' in df.columns:
-                            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-                        df = df.dropna(subset=['latitude', 'longitude'])
-                        dfs.append(df)
-            except Exception:
-                continue
+        if len(file_paths) > 1:
+            # read_csv parses in C with the GIL released, so files overlap on threads;
+            # map() keeps the input order
+            with ThreadPoolExecutor(max_workers=min(MAX_CSV_READERS, len(file_paths))) as pool:
+                results = list(pool.map(lambda path: self._read_csv(path, required_cols), file_paths))
+        else:
+            results = [self._read_csv(path, required_cols) for path in file_paths]
+        dfs = [df for df in results if df is not None]
         
         if dfs:
             return pd.concat(dfs, ignore_index=True)
@@ -1,17 +1,58 @@
 import os
+import re
 import shutil
-import boto3
 import logging
 from abc import ABC, abstractmethod
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
 import uuid
+import secrets
+import time
+import asyncio
+import threading
+from functools import lru_cache
 import aiofiles
+from botocore.exceptions import ClientError
 from core.config import settings
+from core.r2 import get_r2_client, R2_TRANSFER_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Characters not allowed in generated object names (replaced with "_")
+_SANITIZE_FILENAME_RE = re.compile(r'[^\w\-.]')
+
+# Next free "_N" suffix per (prefix, name, extension), so a burst of same-named
+# uploads lists R2 once. Entries expire so writes from other processes are seen again.
+SUFFIX_CACHE_TTL = 30  # seconds
+SUFFIX_CACHE_MAX_ENTRIES = 10_000
+_suffix_cache: Dict[tuple, tuple] = {}  # key -> (next_suffix, expires_at)
+_suffix_cache_lock = threading.Lock()
+
+# The cache is per process, so a cached suffix can still collide with an upload from
+# another worker. Uploads are therefore written with If-None-Match: * and re-named
+# (from a fresh listing) when the key turns out to be taken.
+MAX_NAME_ATTEMPTS = 3
+_KEY_EXISTS_CODES = {'PreconditionFailed', 'ConditionalRequestConflict'}
+
+# Presigned GET URLs are reused within a time window instead of re-signed per call.
+# A cached URL is at most one window old, so it always has ~55 min of validity left.
+PRESIGNED_URL_EXPIRES = 3600  # seconds
+PRESIGNED_URL_WINDOW = 300  # seconds
+PRESIGNED_URL_CACHE_MAX_ENTRIES = 50_000
+_url_cache: Dict[str, tuple] = {}  # key -> (window, url)
+
+
+def _take_cached_suffix(cache_key: tuple) -> Optional[int]:
+    """Claim the next suffix from a live cache entry (None on a miss). Call with the lock held."""
+    entry = _suffix_cache.get(cache_key)
+    if entry is None or entry[1] <= time.monotonic():
+        return None
+    suffix, expires_at = entry
+    _suffix_cache[cache_key] = (suffix + 1, expires_at)
+    return suffix
+
 class StorageService(ABC):
     @abstractmethod
     async def save_file(self, file: UploadFile, user_id: int, category: str, directory: str = "") -> str:
@@ -27,10 +68,20 @@ class StorageService(ABC):
         """
         pass
 
+    @abstractmethod
+    def save_bytes(self, file_path: str, content: bytes) -> str:
+        """Write raw bytes to an exact storage path (used for derived files)"""
+        pass
+
     @abstractmethod
     async def delete_file(self, file_path: str) -> bool:
         pass
 
+    @abstractmethod
+    async def delete_files(self, file_paths: List[str]) -> int:
+        """Delete many files at once; returns how many were deleted"""
+        pass
+
     @abstractmethod
     def get_file_url(self, file_path: str) -> str:
         pass
@@ -46,9 +97,16 @@ class StorageService(ABC):
 
     @abstractmethod
     def get_file_stream(self, file_path: str):
-        """Retrieve file content as a stream iterator"""
+        """
+        Retrieve file content as a stream iterator (sync or async - StreamingResponse
+        accepts both). Missing files raise here, before the response starts.
+        """
         pass
 
+    async def aget_file_content(self, file_path: str) -> bytes:
+        """Retrieve file content as bytes without blocking the event loop"""
+        return await run_in_threadpool(self.get_file_content, file_path)
+
 class LocalStorageService(StorageService):
     def __init__(self, base_dir: str = "uploads"):
         self.base_dir = Path(base_dir)
@@ -64,16 +122,13 @@ class LocalStorageService(StorageService):
                 
             # Generate unique filename
             file_extension = Path(file.filename).suffix if file.filename else ""
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
+            unique_filename = f"{secrets.token_hex(8)}{file_extension}"  # 64 random bits, per user/category dir
             file_path = user_dir / unique_filename
             
-            # Save file
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
-            
-            # Reset file pointer for subsequent reads
-            await file.seek(0)
+            # Save file in chunks - memory stays flat however large the upload. The
+            # whole copy runs in one worker thread instead of two thread hops per chunk.
+            file.file.seek(0)
+            await run_in_threadpool(self._copy_to_file, file.file, file_path)
                 
             # Return relative path for database storage
             relative_path = f"{user_id}/{category}"
@@ -84,6 +139,17 @@ class LocalStorageService(StorageService):
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Local storage error: {str(e)}")
 
+    @staticmethod
+    def _copy_to_file(source, dest_path: Path) -> None:
+        with open(dest_path, 'wb') as dest:
+            shutil.copyfileobj(source, dest, settings.STREAM_CHUNK_SIZE)
+
+    def save_bytes(self, file_path: str, content: bytes) -> str:
+        full_path = self.base_dir / file_path
+        full_path.parent.mkdir(exist_ok=True, parents=True)
+        full_path.write_bytes(content)
+        return file_path
+
     async def delete_file(self, file_path: str) -> bool:
         try:
             full_path = self.base_dir / file_path
@@ -94,6 +160,18 @@ class LocalStorageService(StorageService):
         except Exception:
             return False
 
+    async def delete_files(self, file_paths: List[str]) -> int:
+        deleted = 0
+        for file_path in file_paths:
+            try:
+                (self.base_dir / file_path).unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Local: Error deleting '{file_path}': {e}")
+        return deleted
+
     def get_file_url(self, file_path: str) -> str:
         # In local dev, we serve files statically or via an endpoint
         # The frontend will construct the full URL
@@ -108,16 +186,20 @@ class LocalStorageService(StorageService):
             if not target_dir.exists():
                 return []
                 
+            # scandir entries carry the file type from the directory read, so each
+            # file costs one stat() instead of is_file() + stat()
+            relative_dir = Path(directory) if directory else Path()
             files = []
-            for path in target_dir.iterdir():
-                if path.is_file():
-                    stat = path.stat()
-                    files.append({
-                        "filename": path.name,
-                        "path": str(path.relative_to(self.base_dir)),
-                        "size": stat.st_size,
-                        "updated": stat.st_mtime
-                    })
+            with os.scandir(target_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append({
+                            "filename": entry.name,
+                            "path": str(relative_dir / entry.name),
+                            "size": stat.st_size,
+                            "updated": stat.st_mtime
+                        })
             return files
         except Exception:
             return []
@@ -129,65 +211,99 @@ class LocalStorageService(StorageService):
         except Exception as e:
             raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
 
+    async def aget_file_content(self, file_path: str) -> bytes:
+        try:
+            full_path = self.base_dir / file_path
+            async with aiofiles.open(full_path, 'rb') as f:
+                return await f.read()
+        except Exception as e:
+            raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+
     def get_file_stream(self, file_path: str):
         full_path = self.base_dir / file_path
         if not full_path.exists():
              raise HTTPException(status_code=404, detail="File not found")
-        
-        # Generator to yield file chunks
-        with open(full_path, "rb") as f:
-            while chunk := f.read(64 * 1024):  # 64KB chunks
+        return self._iter_file(full_path)
+
+    async def _iter_file(self, full_path: Path):
+        # Async generator of file chunks (1 MiB by default - fewer reads and ASGI sends per byte)
+        async with aiofiles.open(full_path, 'rb') as f:
+            while chunk := await f.read(settings.STREAM_CHUNK_SIZE):
                 yield chunk
 
 class R2StorageService(StorageService):
     def __init__(self):
-        self.s3_client = boto3.client(
-            service_name='s3',
-            endpoint_url=settings.R2_ENDPOINT_URL,
-            aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
-            region_name='auto'  # Cloudflare R2 requires a region, often 'auto' works or 'us-east-1'
-        )
+        self.s3_client = get_r2_client()  # Shared, thread-safe client (core.r2)
         self.bucket_name = settings.R2_BUCKET_NAME
     
-    def _generate_unique_filename(self, original_filename: str, prefix: str) -> str:
+    @staticmethod
+    def _clean_filename(original_filename: str) -> tuple:
+        """Sanitized (base_name, lowercase extension) of an uploaded filename."""
+        original = Path(original_filename)
+        # Sanitize filename (remove problematic characters)
+        return _SANITIZE_FILENAME_RE.sub('_', original.stem), original.suffix.lower()
+
+    def _random_filename(self, original_filename: str) -> str:
+        """Original name plus a random suffix - can't collide with an existing key."""
+        base_name, extension = self._clean_filename(original_filename)
+        return f"{base_name}_{uuid.uuid4().hex[:8]}{extension}"
+
+    def _generate_unique_filename(self, original_filename: str, prefix: str, use_cache: bool = True) -> str:
         """
         Generate a unique filename based on original, adding _1, _2, etc if duplicates exist.
+        use_cache=False skips the cached suffix and lists R2 again (after a conflict).
         """
-        from pathlib import Path as PurePath
-        
-        # Clean the filename
-        base_name = PurePath(original_filename).stem
-        extension = PurePath(original_filename).suffix.lower()
+        base_name, extension = self._clean_filename(original_filename)
         
-        # Sanitize filename (remove problematic characters)
-        import re
-        base_name = re.sub(r'[^\w\-.]', '_', base_name)
+        # Same name uploaded in the last few seconds - continue from the cached suffix
+        cache_key = (prefix, base_name, extension)
+        if use_cache:
+            with _suffix_cache_lock:
+                suffix = _take_cached_suffix(cache_key)
+            if suffix is not None:
+                return f"{base_name}_{suffix}{extension}"
         
-        # Check if this exact key exists
-        target_key = f"{prefix}/{base_name}{extension}"
+        # One listing of the keys starting with the name instead of a HEAD probe per
+        # candidate suffix; only "<name><ext>" and "<name>_<N><ext>" count as taken
+        name_pattern = re.compile(rf"{re.escape(base_name)}(?:_(\d+))?{re.escape(extension)}")
+        bare_taken = False
+        max_suffix = 0
         
         try:
-            # Check if object exists
-            self.s3_client.head_object(Bucket=self.bucket_name, Key=target_key)
-            # If we get here, it exists - need to find unique suffix
-            
-            suffix = 1
-            while suffix < 1000:  # Safety limit
-                target_key = f"{prefix}/{base_name}_{suffix}{extension}"
-                try:
-                    self.s3_client.head_object(Bucket=self.bucket_name, Key=target_key)
-                    suffix += 1
-                except:
-                    # This one doesn't exist, use it
-                    return f"{base_name}_{suffix}{extension}"
-            
-            # Fallback to UUID if too many duplicates
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f"{prefix}/{base_name}"):
+                for obj in page.get('Contents', ()):
+                    match = name_pattern.fullmatch(obj['Key'][len(prefix) + 1:])
+                    if not match:
+                        continue
+                    if match.group(1) is None:
+                        bare_taken = True
+                    else:
+                        max_suffix = max(max_suffix, int(match.group(1)))
+        except Exception as e:
+            # Can't tell what's taken - a random suffix can't overwrite anything
+            logger.warning(f"R2: Could not list '{prefix}/{base_name}*': {e}")
             return f"{base_name}_{uuid.uuid4().hex[:8]}{extension}"
-            
-        except:
-            # Object doesn't exist, use original name
+        
+        with _suffix_cache_lock:
+            # A live entry covers names claimed in this process that the listing may not
+            # show yet (uploads in flight); the listing covers other workers' writes
+            entry = _suffix_cache.get(cache_key)
+            if entry is not None and entry[1] > time.monotonic():
+                suffix = max(entry[0], max_suffix + 1)
+            else:
+                if len(_suffix_cache) >= SUFFIX_CACHE_MAX_ENTRIES:
+                    now = time.monotonic()
+                    for key in [k for k, (_, exp) in _suffix_cache.items() if exp <= now]:
+                        del _suffix_cache[key]
+                    if len(_suffix_cache) >= SUFFIX_CACHE_MAX_ENTRIES:
+                        _suffix_cache.clear()
+                suffix = 0 if not bare_taken else max_suffix + 1
+            _suffix_cache[cache_key] = (max(suffix, max_suffix) + 1, time.monotonic() + SUFFIX_CACHE_TTL)
+        
+        if suffix == 0:
             return f"{base_name}{extension}"
+        return f"{base_name}_{suffix}{extension}"
         
     async def save_file(self, file: UploadFile, user_id: int, category: str, directory: str = "") -> str:
         try:
@@ -196,22 +312,39 @@ class R2StorageService(StorageService):
             if directory:
                 prefix += f"/{directory}"
             
-            # Generate unique filename based on original (with _1, _2 for duplicates)
-            unique_filename = self._generate_unique_filename(file.filename or "unnamed", prefix)
-            
-            # Construct full object key
-            object_key = f"{prefix}/{unique_filename}"
-            
-            # Upload file
-            file.file.seek(0)
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=object_key,
-                Body=file.file
-            )
+            original_filename = file.filename or "unnamed"
+            file_size = file.size
+            if file_size is None:
+                file_size = file.file.seek(0, os.SEEK_END)
             
-            # Reset file pointer
-            await file.seek(0)
+            if file_size <= R2_TRANSFER_CONFIG.multipart_threshold:
+                # Generate unique filename based on original (with _1, _2 for duplicates),
+                # written only if the key is still free; on a conflict list again and retry
+                for attempt in range(MAX_NAME_ATTEMPTS):
+                    unique_filename = await run_in_threadpool(
+                        self._generate_unique_filename, original_filename, prefix, attempt == 0
+                    )
+                    object_key = f"{prefix}/{unique_filename}"
+                    if await run_in_threadpool(self._put_if_absent, file.file, object_key):
+                        break
+                    logger.info(f"R2: '{object_key}' was taken meanwhile, picking another name")
+                else:
+                    object_key = f"{prefix}/{self._random_filename(original_filename)}"
+                    if not await run_in_threadpool(self._put_if_absent, file.file, object_key):
+                        raise RuntimeError(f"could not find a free key for '{original_filename}'")
+            else:
+                # Multipart upload (parallel part PUTs) in a worker thread so the event loop
+                # isn't blocked. upload_fileobj can't make it conditional, so large files
+                # get a random suffix instead of a listed one that another worker may take.
+                object_key = f"{prefix}/{self._random_filename(original_filename)}"
+                file.file.seek(0)
+                await run_in_threadpool(
+                    self.s3_client.upload_fileobj,
+                    file.file,
+                    self.bucket_name,
+                    object_key,
+                    Config=R2_TRANSFER_CONFIG
+                )
             
             logger.info(f"R2: Saved '{file.filename}' as '{object_key}'")
             return object_key
@@ -219,14 +352,51 @@ class R2StorageService(StorageService):
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"R2 storage error: {str(e)}")
 
+    def _put_if_absent(self, fileobj, object_key: str) -> bool:
+        """Single PUT that R2 rejects if the key exists; False when it was already taken."""
+        fileobj.seek(0)
+        try:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=object_key, Body=fileobj, IfNoneMatch='*')
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in _KEY_EXISTS_CODES:
+                return False
+            raise
+
+    def save_bytes(self, file_path: str, content: bytes) -> str:
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=file_path, Body=content)
+        logger.info(f"R2: Saved derived file '{file_path}'")
+        return file_path
+
     async def delete_file(self, file_path: str) -> bool:
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=file_path)
+            await run_in_threadpool(self.s3_client.delete_object, Bucket=self.bucket_name, Key=file_path)
             return True
         except Exception as e:
             logger.warning(f"R2: Error deleting '{file_path}': {e}")
             return False
 
+    def _delete_batch(self, keys: List[str]) -> int:
+        """One DeleteObjects call for up to 1000 keys; returns the number deleted."""
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+            )
+        except Exception as e:
+            logger.warning(f"R2: Error deleting {len(keys)} objects: {e}")
+            return 0
+        errors = response.get('Errors', [])
+        for err in errors[:5]:
+            logger.warning(f"R2: Error deleting '{err.get('Key')}': {err.get('Message')}")
+        return len(keys) - len(errors)
+
+    async def delete_files(self, file_paths: List[str]) -> int:
+        # DeleteObjects takes up to 1000 keys; batches go out concurrently
+        batches = [file_paths[i:i + 1000] for i in range(0, len(file_paths), 1000)]
+        counts = await asyncio.gather(*(run_in_threadpool(self._delete_batch, batch) for batch in batches))
+        return sum(counts)
+
     def get_file_url(self, file_path: str) -> str:
         # Generate a public URL or a presigned URL
         # For public buckets:
@@ -235,29 +405,40 @@ class R2StorageService(StorageService):
         # For now, let's assume we use presigned URLs for strict access, or just return the key
         # if the frontend knows how to build the public URL.
         # Let's generate a presigned URL for safety.
+        window = int(time.time()) // PRESIGNED_URL_WINDOW
+        cached = _url_cache.get(file_path)
+        if cached is not None and cached[0] == window:
+            return cached[1]
+        
         try:
             url = self.s3_client.generate_presigned_url(
                 ClientMethod='get_object',
                 Params={'Bucket': self.bucket_name, 'Key': file_path},
-                ExpiresIn=3600
+                ExpiresIn=PRESIGNED_URL_EXPIRES
             )
-            return url
         except Exception:
             return file_path
+        
+        if len(_url_cache) >= PRESIGNED_URL_CACHE_MAX_ENTRIES:
+            _url_cache.clear()
+        _url_cache[file_path] = (window, url)
+        return url
             
     def list_files(self, directory: str = "") -> List[Dict[str, Any]]:
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=directory
-            )
-            
+            # Paginate - a single list_objects_v2 call stops at 1000 keys
+            paginator = self.s3_client.get_paginator('list_objects_v2')
             files = []
-            if 'Contents' in response:
-                for obj in response['Contents']:
+            for page in paginator.paginate(
+                Bucket=self.bucket_name,
+                Prefix=directory,
+                PaginationConfig={'PageSize': 1000}
+            ):
+                for obj in page.get('Contents', ()):
+                    key = obj['Key']
                     files.append({
-                        "filename": Path(obj['Key']).name,
-                        "path": obj['Key'],
+                        "filename": key.rsplit('/', 1)[-1],
+                        "path": key,
                         "size": obj['Size'],
                         "updated": obj['LastModified'].isoformat()
                     })
@@ -280,7 +461,7 @@ class R2StorageService(StorageService):
             # get_object returns a dict with 'Body' which is a StreamingBody
             response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_path)
             # iter_chunks yields bytes
-            return response['Body'].iter_chunks(chunk_size=64 * 1024)
+            return response['Body'].iter_chunks(chunk_size=settings.STREAM_CHUNK_SIZE)
         except Exception as e:
             logger.error(f"R2: Failed to stream '{file_path}': {e}")
             raise HTTPException(status_code=500, detail=f"Error streaming file from R2: {str(e)}")
@@ -313,7 +494,13 @@ class R2StorageService(StorageService):
             logger.error(f"R2: Failed to generate presigned upload URL: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to generate upload URL: {str(e)}")
 
+@lru_cache(maxsize=1)
 def get_storage_service() -> StorageService:
+    """
+    Process-wide storage service, created on first use. Instances are shared across
+    requests and threads: they hold no per-request state, the R2 client is
+    thread-safe, and the module-level caches are guarded or GIL-atomic.
+    """
     if settings.STORAGE_MODE == "s3":
         return R2StorageService()
     return LocalStorageService()
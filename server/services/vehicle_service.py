@@ -0,0 +1,220 @@
+"""
+Vehicle detection processing shared by the upload pipeline and the vehicle endpoint.
+"""
+
+import logging
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.upload import UploadModel
+from services.storage_service import StorageService
+from utils.response_cache import store_cached_payload, cached_payload_values
+
+logger = logging.getLogger(__name__)
+
+
+# Sibling file written next to each vehicle CSV at upload time
+PARQUET_SUFFIX = '.parquet'
+
+
+def parquet_sibling_path(storage_path: str) -> str:
+    return f"{storage_path}{PARQUET_SUFFIX}"
+
+
+def normalize_vehicle_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize a raw vehicle detection frame to the typed columns the map needs:
+    latitude/longitude (float32), vehicle_type (category) and an optional timestamp.
+    """
+    # Normalize column names
+    df.columns = [c.lower() for c in df.columns]
+    
+    # Check required columns
+    required = ['latitude', 'longitude', 'vehicle_type']
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        # Try fallback names if specific ones missing
+        if 'lat' in df.columns: df.rename(columns={'lat': 'latitude'}, inplace=True)
+        if 'lon' in df.columns: df.rename(columns={'lon': 'longitude'}, inplace=True)
+        
+        # Recheck
+        missing = [c for c in required if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+
+    # Filter rows
+    valid_types = ['car', 'truck', 'bicycle', 'motorcycle']
+    df = df[df['vehicle_type'].isin(valid_types)]
+    
+    # Downcast: float32 is plenty for map display
+    normalized = pd.DataFrame({
+        'latitude': df['latitude'].astype('float32'),
+        'longitude': df['longitude'].astype('float32'),
+        'vehicle_type': df['vehicle_type'].astype('category')
+    })
+
+    # Extract timestamp if available
+    timestamp_col = next((c for c in ('timestamp', 'time') if c in df.columns), None)
+    if timestamp_col:
+        normalized['timestamp'] = df[timestamp_col]
+
+    return normalized.reset_index(drop=True)
+
+
+def build_vehicle_payload(df: pd.DataFrame, filename: str) -> Dict[str, Any]:
+    """
+    Build the map-ready response payload from a normalized vehicle frame.
+    """
+    if df.empty:
+        return {
+            "success": True,
+            "filename": filename,
+            "count": 0,
+            "data": []
+        }
+    
+    records = pd.DataFrame({
+        "lat": df['latitude'],
+        "lon": df['longitude'],
+        "type": df['vehicle_type'].astype(str),
+        "timestamp": df['timestamp'] if 'timestamp' in df.columns else None,
+        "count": np.int8(1)
+    })
+    # Round to float32 precision so the JSON doesn't carry float64 widening noise
+    records[['lat', 'lon']] = records[['lat', 'lon']].astype('float64').round(6)
+
+    # Convert to list of objects
+    result_data = records.to_dict(orient='records')
+    
+    return {
+        "success": True,
+        "filename": filename,
+        "count": len(result_data),
+        "data": result_data
+    }
+
+
+def parse_vehicle_csv(content_bytes: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Parse a vehicle detection CSV into the map-ready response payload.
+    CPU-bound - run it in a threadpool or background task, never on the event loop.
+    """
+    df = normalize_vehicle_frame(pd.read_csv(BytesIO(content_bytes)))
+    return build_vehicle_payload(df, filename)
+
+
+def parse_vehicle_parquet(content_bytes: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Same as parse_vehicle_csv, but from the pre-normalized Parquet sibling.
+    """
+    return build_vehicle_payload(pd.read_parquet(BytesIO(content_bytes)), filename)
+
+
+def vehicle_frame_to_parquet(df: pd.DataFrame) -> bytes:
+    """
+    Serialize a normalized vehicle frame to zstd-compressed Parquet (requires pyarrow).
+    """
+    buffer = BytesIO()
+    df.to_parquet(buffer, compression='zstd', index=False)
+    return buffer.getvalue()
+
+
+def aggregate_vehicle_payload(payload: Dict[str, Any], decimals: int) -> Dict[str, Any]:
+    """
+    Bin raw detections into a lat/lon grid (rounded to `decimals` places)
+    and return one entry per (cell, vehicle type) with the detection count.
+    """
+    if not payload["data"]:
+        return payload
+
+    # Rows without coordinates have no cell (and NaN can't be cast to int32)
+    df = pd.DataFrame(payload["data"], columns=['lat', 'lon', 'type']).dropna(subset=['lat', 'lon'])
+    scale = 10 ** decimals
+
+    # Integer cell keys group faster than floats and avoid rounding ties between cells
+    agg = (
+        df.assign(
+            lat_b=(df['lat'] * scale).round().astype('int32'),
+            lon_b=(df['lon'] * scale).round().astype('int32')
+        )
+        .groupby(['lat_b', 'lon_b', 'type'], sort=False)
+        .size()
+        .reset_index(name='count')
+    )
+    agg['lat'] = agg['lat_b'] / scale
+    agg['lon'] = agg['lon_b'] / scale
+
+    data = agg[['lat', 'lon', 'type', 'count']].to_dict(orient='records')
+    return {**payload, "count": len(data), "data": data}
+
+def store_vehicle_cache(db: Session, upload_record: UploadModel, response_data: Dict[str, Any]) -> bytes:
+    """
+    Save the processed payload gzipped on the upload record and commit.
+    Returns the gzipped blob so callers can serve it directly.
+    """
+    cached_blob = store_cached_payload(upload_record, response_data)
+    filename = upload_record.original_filename  # Read before the commit expires the record
+    db.commit()
+    logger.info(f"Cached vehicle data for {filename} ({response_data['count']} records, {len(cached_blob)} bytes gzipped)")
+    return cached_blob
+
+
+def store_vehicle_cache_for_upload(upload_id: int, response_data: Dict[str, Any]) -> Tuple[bytes, Optional[datetime]]:
+    """
+    store_vehicle_cache in a session of its own, for work that can outlive the
+    request that started it (single-flighted cache fills).
+    Returns the gzipped blob and the new cache_timestamp.
+    """
+    values = cached_payload_values(response_data)
+    db = SessionLocal()
+    try:
+        # Plain UPDATE - no SELECT of the row before or after
+        result = db.execute(update(UploadModel).where(UploadModel.id == upload_id).values(**values))
+        if result.rowcount == 0:
+            raise ValueError(f"Upload {upload_id} no longer exists")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    logger.info(f"Cached vehicle data for upload {upload_id} ({response_data['count']} records, {len(values['cached_data_gz'])} bytes gzipped)")
+    return values["cached_data_gz"], values["cache_timestamp"]
+
+
+def build_vehicle_cache(upload_id: int, storage: StorageService) -> None:
+    """
+    Precompute the vehicle response right after upload so the first GET is a cache hit,
+    and store a Parquet sibling of the CSV for later cache rebuilds.
+    Runs as a background task, so it opens its own session and never raises.
+    """
+    db = SessionLocal()
+    try:
+        upload_record = db.query(UploadModel).filter(UploadModel.id == upload_id).first()
+        if not upload_record or upload_record.cached_data_gz:
+            return
+
+        content_bytes = storage.get_file_content(upload_record.storage_path)
+        df = normalize_vehicle_frame(pd.read_csv(BytesIO(content_bytes)))
+
+        # Columnar copy for the hot path - a cache miss then skips CSV parsing entirely
+        try:
+            storage.save_bytes(parquet_sibling_path(upload_record.storage_path), vehicle_frame_to_parquet(df))
+        except Exception as parquet_err:
+            logger.warning(f"Could not write Parquet copy for upload {upload_id}: {parquet_err}")
+
+        response_data = build_vehicle_payload(df, upload_record.original_filename)
+        if response_data["data"]:
+            store_vehicle_cache(db, upload_record, response_data)
+    except Exception as e:
+        logger.warning(f"Vehicle precompute failed for upload {upload_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -5,12 +5,17 @@ API_URL = "http://localhost:8000/api/v1"
 FILE_PATH = "/home/jacob/repos/DAAN/streamlit_package/pothole_data/pothole_detections.csv"
 
 def test_pothole_flow():
+    # One session for upload -> process: the second request reuses the connection
+    with requests.Session() as session:
+        _run_pothole_flow(session)
+
+def _run_pothole_flow(session: requests.Session):
     # 1. Upload File
     print(f"Uploading {FILE_PATH}...")
     with open(FILE_PATH, 'rb') as f:
         files = {'file': ('pothole_detections.csv', f, 'text/csv')}
         params = {'type': 'pothole'}
-        upload_res = requests.post(f"{API_URL}/upload/", files=files, params=params)
+        upload_res = session.post(f"{API_URL}/upload/", files=files, params=params)
     
     if upload_res.status_code != 200:
         print(f"Upload failed: {upload_res.text}")
@@ -22,7 +27,7 @@ def test_pothole_flow():
 
     # 2. Process File
     print(f"Processing {filename}...")
-    process_res = requests.get(f"{API_URL}/pothole/process/{filename}")
+    process_res = session.get(f"{API_URL}/pothole/process/{filename}")
     
     if process_res.status_code != 200:
         print(f"Processing failed: {process_res.text}")
@@ -36,10 +41,10 @@ def test_pothole_flow():
         print(f"Number of markers: {len(data)}")
         if len(data) > 0:
             print("First marker sample:", data[0])
-            # Check for NaN
-            for i, item in enumerate(data):
-                if item['lat'] is None or item['lon'] is None:
-                    print(f"Found None coordinates at index {i}")
+            # Check for NaN - one summary line instead of a print per bad marker
+            bad = [i for i, item in enumerate(data) if item['lat'] is None or item['lon'] is None]
+            if bad:
+                print(f"Found {len(bad)} markers with None coordinates, first at index {bad[0]}")
     else:
         print("No 'data' key in response")
 
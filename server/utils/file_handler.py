@@ -1,11 +1,50 @@
 import os
 import aiofiles
 import uuid
+import hashlib
+from io import BytesIO
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import BinaryIO, Optional, List, Dict, Tuple, Union
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 from fastapi import UploadFile, HTTPException
 from services.storage_service import get_storage_service
 
+# Large reads keep the per-chunk Python overhead negligible next to the hashing itself
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def hash_file(file_obj: BinaryIO) -> Tuple[str, int]:
+    """
+    MD5 hex digest and size of a file object in one pass; leaves it rewound.
+    MD5 is kept so new hashes still match the file_hash of existing uploads.
+    """
+    hasher = hashlib.md5(usedforsecurity=False)
+    size = 0
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(HASH_CHUNK_SIZE), b""):
+        hasher.update(chunk)
+        size += len(chunk)
+    file_obj.seek(0)
+    return hasher.hexdigest(), size
+
+
+def csv_unique_values(source: Union[bytes, BinaryIO], column: str) -> Optional[List[str]]:
+    """
+    Distinct non-null values of one CSV column, or None if the column is missing.
+    Only that column is parsed, and nulls/duplicates are dropped on Arrow's
+    native string arrays, so one Python object is built per distinct value.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    try:
+        table = pacsv.read_csv(source, convert_options=pacsv.ConvertOptions(include_columns=[column]))
+    except KeyError:
+        # ArrowKeyError - column not in the header
+        return None
+    return pc.unique(pc.drop_null(table.column(column))).to_pylist()
+
+
 class FileHandler:
     def __init__(self):
         self.storage = get_storage_service()
@@ -46,6 +85,10 @@ class FileHandler:
     async def delete_file_async(self, file_path: str) -> bool:
          return await self.storage.delete_file(file_path)
 
+    async def delete_files_async(self, file_paths: List[str]) -> int:
+        """Delete many files in as few storage calls as possible; returns how many were deleted"""
+        return await self.storage.delete_files(file_paths)
+
     def list_uploaded_files(self) -> list:
         """
         List all files
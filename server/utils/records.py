@@ -0,0 +1,12 @@
+from typing import Any, Dict, List
+
+
+def column_records(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Equal-length columns (NumPy arrays, Series or lists) -> list of row dicts.
+    tolist() turns each column into native Python values in C, then rows are
+    zipped - no per-row Series and no per-cell boxing as in to_dict('records').
+    """
+    keys = list(columns)
+    values = [col.tolist() if hasattr(col, 'tolist') else list(col) for col in columns.values()]
+    return [dict(zip(keys, row)) for row in zip(*values)]
@@ -0,0 +1,132 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+# Level 5 keeps most of the ratio of level 9 on repetitive JSON at a fraction of the CPU
+GZIP_LEVEL = 5
+
+
+def compress_payload(payload: Any) -> bytes:
+    """
+    Serialize a response payload to gzipped JSON for the cached_data_gz column.
+    Stays gzip (not zstd/msgpack) so the blob can be sent to browsers untouched.
+    """
+    return gzip.compress(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), compresslevel=GZIP_LEVEL)
+
+
+def decompress_payload(blob: bytes) -> Any:
+    """
+    Inverse of compress_payload.
+    """
+    return orjson.loads(gzip.decompress(blob))
+
+
+def load_cached_payload(record) -> Optional[Any]:
+    """
+    Cached payload of an upload record: the gzipped column first, then the
+    legacy JSON text column. Returns None when nothing usable is cached.
+    """
+    if record.cached_data_gz:
+        try:
+            return decompress_payload(record.cached_data_gz)
+        except (OSError, orjson.JSONDecodeError):
+            pass
+    if record.cached_data:
+        try:
+            return json.loads(record.cached_data)
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def cached_payload_values(payload: Any) -> Dict[str, Any]:
+    """
+    Upload column values that store a payload gzipped, for an UPDATE or a record.
+    cache_timestamp is set here (naive UTC, like the column) rather than by the
+    database, so callers know it without reading the row back after the commit.
+    """
+    return {
+        "cached_data_gz": compress_payload(payload),
+        "cached_data": None,  # Superseded by the gzipped copy
+        "cache_timestamp": datetime.now(timezone.utc).replace(tzinfo=None),
+    }
+
+
+def store_cached_payload(record, payload: Any) -> bytes:
+    """
+    Store a payload gzipped on an upload record (caller commits).
+    Returns the blob so it can be served directly.
+    """
+    values = cached_payload_values(payload)
+    for column, value in values.items():
+        setattr(record, column, value)
+    return values["cached_data_gz"]
+
+
+def clear_cached_payload(record) -> None:
+    record.cached_data_gz = None
+    record.cached_data = None
+
+
+def cache_etag(record_id: int, cache_timestamp: Optional[datetime]) -> Optional[str]:
+    """
+    Weak ETag for a cached payload - changes whenever the cache is rebuilt.
+    """
+    if cache_timestamp is None:
+        return None
+    return f'W/"{record_id}-{int(cache_timestamp.timestamp())}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """
+    True when the client's If-None-Match already covers this ETag.
+    """
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip, honouring q-values
+    ("gzip;q=0" refuses it; "*" covers gzip when gzip isn't listed).
+    """
+    qvalues: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    if "gzip" in qvalues:
+        return qvalues["gzip"] > 0
+    return qvalues.get("*", 0.0) > 0
+
+
+def gzip_json_response(blob: bytes, request: Request, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serve a gzipped JSON blob without re-encoding it.
+    Clients that don't accept gzip get the decompressed body instead.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"  # Both representations share the URL
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=blob, media_type="application/json", headers=headers)
+    return Response(content=gzip.decompress(blob), media_type="application/json", headers=headers)